@@ -1,20 +1,54 @@
 # Empty __init__ for agents package
-from .speaker import generate_word, set_speaker_llm
-from .estimator import decide_action, set_estimator_llm
+from .speaker import (
+    generate_word,
+    agenerate_word,
+    generate_words_batch,
+    agenerate_words_batch,
+    set_speaker_llm,
+)
+from .estimator import (
+    decide_action,
+    adecide_action,
+    decide_actions_batch,
+    adecide_actions_batch,
+    decide_actions_mock_batch,
+    set_estimator_llm,
+)
 from .discussion import (
     generate_question,
+    agenerate_question,
     generate_player_question,
+    agenerate_player_question,
     generate_answer,
+    agenerate_answer,
+    generate_player_questions_batch,
+    generate_answers_batch,
+    generate_answers_for_questions,
+    run_discussion_round,
     set_discussion_llm,
 )
 
 __all__ = [
     "generate_word",
+    "agenerate_word",
+    "generate_words_batch",
+    "agenerate_words_batch",
     "set_speaker_llm",
     "decide_action",
+    "adecide_action",
+    "decide_actions_batch",
+    "adecide_actions_batch",
+    "decide_actions_mock_batch",
     "set_estimator_llm",
     "generate_question",
+    "agenerate_question",
     "generate_player_question",
+    "agenerate_player_question",
     "generate_answer",
+    "agenerate_answer",
+    "generate_player_questions_batch",
+    "generate_answers_batch",
+    "generate_answers_for_questions",
+    "run_discussion_round",
     "set_discussion_llm",
 ]
@@ -0,0 +1,13 @@
+# Mock-mode estimator for whole tables at once; matches the per-agent mock in
+# decide_action. A plain comprehension: tables hold a handful of agents, and
+# an array kernel never recovered its conversion cost at any size.
+
+from typing import Sequence
+
+# Mock policy: PLAY below this number, WAIT otherwise
+MOCK_PLAY_BELOW = 20
+
+
+def mock_play_mask(numbers: Sequence[int]) -> list[bool]:
+    """True for every number the mock estimator would PLAY."""
+    return [number < MOCK_PLAY_BELOW for number in numbers]
@@ -1,31 +1,130 @@
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from typing import Dict
+import logging
+from contextvars import ContextVar
+from typing import Any
 
+from models.schemas import AnswerOutput, QuestionOutput
 from models.prompts import (
     DISCUSSION_SYSTEM_PROMPT,
+    DISCUSSION_USER_PROMPT,
     DISCUSSION_ANSWER_SYSTEM_PROMPT,
+    DISCUSSION_ANSWER_USER_PROMPT,
     DISCUSSION_PLAYER_QUESTION_SYSTEM_PROMPT,
+    DISCUSSION_PLAYER_QUESTION_USER_PROMPT,
+    DISCUSSION_ROUND_SYSTEM_PROMPT,
+    DISCUSSION_ROUND_USER_PROMPT,
 )
-from utils.llm import create_chat_llm, get_model, get_provider
-from utils.parsing import parse_json_object
+from utils.llm import ainvoke_with_retry, create_chat_llm, get_chain, get_model, get_provider, is_mock_mode
+from utils.parsing import agent_at_index, as_json_object, format_utterances, parse_json_object, truncate_history
+from utils.prompting import FormatPrompt
 
 
-_global_discussion_llm = None
+_DISCUSSION_PROMPT = FormatPrompt(DISCUSSION_SYSTEM_PROMPT, DISCUSSION_USER_PROMPT)
+_DISCUSSION_PLAYER_QUESTION_PROMPT = FormatPrompt(
+    DISCUSSION_PLAYER_QUESTION_SYSTEM_PROMPT, DISCUSSION_PLAYER_QUESTION_USER_PROMPT
+)
+_DISCUSSION_ANSWER_PROMPT = FormatPrompt(DISCUSSION_ANSWER_SYSTEM_PROMPT, DISCUSSION_ANSWER_USER_PROMPT)
+_DISCUSSION_ROUND_PROMPT = FormatPrompt(DISCUSSION_ROUND_SYSTEM_PROMPT, DISCUSSION_ROUND_USER_PROMPT)
+
+logger = logging.getLogger(__name__)
+
+# Process-wide LLM shared by every thread; the ContextVar overrides it per
+# thread/asyncio task so concurrent games can use different models
+_discussion_llm_default: Any = None
+_discussion_llm_var: ContextVar[Any] = ContextVar("discussion_llm", default=None)
+
+# Upper bound on concurrent requests issued by the *_batch helpers
+_MAX_CONCURRENCY = 8
+
+# Fallbacks used in mock mode and when the model output is unusable
+_DEFAULT_QUESTION = "それぞれの発言は、どれくらい強い/大きいイメージですか？"
+_DEFAULT_PLAYER_QUESTION = "今の発言は、どんなイメージの度合いですか？"
+_DEFAULT_ANSWER = "私の発言は、直感的にイメージできる範囲の強さ/大きさを意図しています。"
 
 
 def _get_discussion_llm(mock_llm=None):
     """Get or create the discussion LLM instance."""
-    global _global_discussion_llm
-    if _global_discussion_llm is None:
-        _global_discussion_llm = create_chat_llm(role="discussion", temperature=0.2, mock_llm=mock_llm)
-    return _global_discussion_llm
+    llm = _discussion_llm_var.get()
+    if llm is None:
+        llm = _discussion_llm_default
+    if llm is None:
+        if is_mock_mode():
+            # Skip create_chat_llm entirely; a later set_discussion_llm still wins
+            return None
+        llm = create_chat_llm(role="discussion", temperature=0.2, mock_llm=mock_llm)
+        if llm is not None:
+            set_discussion_llm(llm)
+    return llm
+
+
+def set_discussion_llm(llm, *, context_only: bool = False):
+    """Set a custom LLM for the discussion agent.
+
+    By default the LLM is used process-wide, including threads started later.
+    With context_only=True it only applies to the current thread/asyncio task
+    (and tasks or copy_context() runs started from it).
+    """
+    global _discussion_llm_default
+    if context_only:
+        _discussion_llm_var.set(llm)
+    else:
+        _discussion_llm_default = llm
+        _discussion_llm_var.set(None)
+
+
+def _question_chain(llm):
+    return get_chain(_DISCUSSION_PROMPT, llm, QuestionOutput)
+
+
+def _player_question_chain(llm):
+    return get_chain(_DISCUSSION_PLAYER_QUESTION_PROMPT, llm, QuestionOutput)
+
 
+def _answer_chain(llm):
+    return get_chain(_DISCUSSION_ANSWER_PROMPT, llm, AnswerOutput)
 
-def set_discussion_llm(llm):
-    """Set a custom LLM for the discussion agent."""
-    global _global_discussion_llm
-    _global_discussion_llm = llm
+
+def _round_chain(llm):
+    return get_chain(_DISCUSSION_ROUND_PROMPT, llm)
+
+
+def _parse_question(text: Any, default: str) -> dict:
+    result = as_json_object(text)
+    question = str(result.get("question", "")).strip()
+    return {"question": question or default}
+
+
+def _parse_answer(text: Any) -> dict:
+    result = as_json_object(text)
+    answer = str(result.get("answer", "")).strip()
+    return {"answer": answer or _DEFAULT_ANSWER}
+
+
+def _question_inputs(theme, last_played_card, utterances_str, history) -> dict:
+    return {
+        "theme": theme,
+        "last_played_card": last_played_card,
+        "utterances": utterances_str,
+        "history": history,
+    }
+
+
+def _player_question_inputs(theme, last_played_card, utterances_str, my_word, history) -> dict:
+    return {
+        "theme": theme,
+        "last_played_card": last_played_card,
+        "utterances": utterances_str,
+        "my_word": my_word,
+        "history": history,
+    }
+
+
+def _answer_inputs(theme, question, my_word, history) -> dict:
+    return {
+        "theme": theme,
+        "question": question,
+        "my_word": my_word,
+        "history": history,
+    }
 
 
 def generate_question(
@@ -34,36 +133,55 @@ def generate_question(
     utterances: dict[str, str],
     history: str = "",
     mock_llm=None,
+    utterances_str: str | None = None,
 ) -> dict:
-    """Generates one clarifying question to unblock the game when everyone waits."""
+    """Generates one clarifying question to unblock the game when everyone waits.
+
+    ``utterances_str`` may carry ``utterances`` already formatted as
+    "agent: word" lines so callers can build it once per turn.
+    """
     llm = _get_discussion_llm(mock_llm=mock_llm)
 
     if llm is None:
         # Mock: simple generic question
-        return {"question": "それぞれの発言は、どれくらい強い/大きいイメージですか？"}
+        return {"question": _DEFAULT_QUESTION}
 
-    utterances_str = "\n".join([f"{agent}: {word}" for agent, word in utterances.items()])
+    history = truncate_history(history)
+    try:
+        if utterances_str is None:
+            utterances_str = format_utterances(utterances)
+        text = _question_chain(llm).invoke(_question_inputs(theme, last_played_card, utterances_str, history))
+        return _parse_question(text, _DEFAULT_QUESTION)
+    except Exception as e:
+        logger.warning("Error generating discussion question: %s", e)
+        return {"question": _DEFAULT_QUESTION}
 
-    prompt = ChatPromptTemplate.from_template(DISCUSSION_SYSTEM_PROMPT)
-    chain = prompt | llm | StrOutputParser()
 
+async def agenerate_question(
+    theme: str,
+    last_played_card: int,
+    utterances: dict[str, str],
+    history: str = "",
+    mock_llm=None,
+    utterances_str: str | None = None,
+) -> dict:
+    """Async variant of generate_question (bounded by the shared LLM semaphore)."""
+    llm = _get_discussion_llm(mock_llm=mock_llm)
+
+    if llm is None:
+        return {"question": _DEFAULT_QUESTION}
+
+    history = truncate_history(history)
     try:
-        text = chain.invoke(
-            {
-                "theme": theme,
-                "last_played_card": last_played_card,
-                "utterances": utterances_str,
-                "history": history,
-            }
+        if utterances_str is None:
+            utterances_str = format_utterances(utterances)
+        text = await ainvoke_with_retry(
+            _question_chain(llm), _question_inputs(theme, last_played_card, utterances_str, history)
         )
-        result = parse_json_object(text)
-        question = str(result.get("question", "")).strip()
-        if not question:
-            question = "それぞれの発言は、どれくらい強い/大きいイメージですか？"
-        return {"question": question}
+        return _parse_question(text, _DEFAULT_QUESTION)
     except Exception as e:
-        print(f"Error generating discussion question: {e}")
-        return {"question": "それぞれの発言は、どれくらい強い/大きいイメージですか？"}
+        logger.warning("Error generating discussion question: %s", e)
+        return {"question": _DEFAULT_QUESTION}
 
 
 def generate_player_question(
@@ -73,36 +191,51 @@ def generate_player_question(
     my_word: str,
     history: str = "",
     mock_llm=None,
+    utterances_str: str | None = None,
 ) -> dict:
     """Generates one question proposal from a player (non-numeric, short)."""
     llm = _get_discussion_llm(mock_llm=mock_llm)
 
     if llm is None:
-        return {"question": "今の発言は、どんなイメージの度合いですか？"}
+        return {"question": _DEFAULT_PLAYER_QUESTION}
 
-    utterances_str = "\n".join([f"{agent}: {word}" for agent, word in utterances.items()])
+    history = truncate_history(history)
+    if utterances_str is None:
+        utterances_str = format_utterances(utterances)
+    inputs = _player_question_inputs(theme, last_played_card, utterances_str, my_word, history)
+    try:
+        text = _player_question_chain(llm).invoke(inputs)
+        return _parse_question(text, _DEFAULT_PLAYER_QUESTION)
+    except Exception as e:
+        logger.warning("Error generating player discussion question: %s", e)
+        return {"question": _DEFAULT_PLAYER_QUESTION}
 
-    prompt = ChatPromptTemplate.from_template(DISCUSSION_PLAYER_QUESTION_SYSTEM_PROMPT)
-    chain = prompt | llm | StrOutputParser()
 
+async def agenerate_player_question(
+    theme: str,
+    last_played_card: int,
+    utterances: dict[str, str],
+    my_word: str,
+    history: str = "",
+    mock_llm=None,
+    utterances_str: str | None = None,
+) -> dict:
+    """Async variant of generate_player_question (bounded by the shared LLM semaphore)."""
+    llm = _get_discussion_llm(mock_llm=mock_llm)
+
+    if llm is None:
+        return {"question": _DEFAULT_PLAYER_QUESTION}
+
+    history = truncate_history(history)
+    if utterances_str is None:
+        utterances_str = format_utterances(utterances)
+    inputs = _player_question_inputs(theme, last_played_card, utterances_str, my_word, history)
     try:
-        text = chain.invoke(
-            {
-                "theme": theme,
-                "last_played_card": last_played_card,
-                "utterances": utterances_str,
-                "my_word": my_word,
-                "history": history,
-            }
-        )
-        result = parse_json_object(text)
-        question = str(result.get("question", "")).strip()
-        if not question:
-            question = "今の発言は、どんなイメージの度合いですか？"
-        return {"question": question}
+        text = await ainvoke_with_retry(_player_question_chain(llm), inputs)
+        return _parse_question(text, _DEFAULT_PLAYER_QUESTION)
     except Exception as e:
-        print(f"Error generating player discussion question: {e}")
-        return {"question": "今の発言は、どんなイメージの度合いですか？"}
+        logger.warning("Error generating player discussion question: %s", e)
+        return {"question": _DEFAULT_PLAYER_QUESTION}
 
 
 def generate_answer(
@@ -116,29 +249,200 @@ def generate_answer(
     llm = _get_discussion_llm(mock_llm=mock_llm)
 
     if llm is None:
-        return {
-            "answer": "私の発言は、直感的にイメージできる範囲の強さ/大きさを意図しています。"
-        }
+        return {"answer": _DEFAULT_ANSWER}
+
+    history = truncate_history(history)
+    try:
+        text = _answer_chain(llm).invoke(_answer_inputs(theme, question, my_word, history))
+        return _parse_answer(text)
+    except Exception as e:
+        logger.warning("Error generating discussion answer: %s", e)
+        return {"answer": _DEFAULT_ANSWER}
 
-    prompt = ChatPromptTemplate.from_template(DISCUSSION_ANSWER_SYSTEM_PROMPT)
-    chain = prompt | llm | StrOutputParser()
 
+async def agenerate_answer(
+    theme: str,
+    question: str,
+    my_word: str,
+    history: str = "",
+    mock_llm=None,
+) -> dict:
+    """Async variant of generate_answer (bounded by the shared LLM semaphore)."""
+    llm = _get_discussion_llm(mock_llm=mock_llm)
+
+    if llm is None:
+        return {"answer": _DEFAULT_ANSWER}
+
+    history = truncate_history(history)
     try:
-        text = chain.invoke(
-            {
-                "theme": theme,
-                "question": question,
-                "my_word": my_word,
-                "history": history,
-            }
-        )
-        result = parse_json_object(text)
-        answer = str(result.get("answer", "")).strip()
-        if not answer:
-            answer = "私の発言は、直感的にイメージできる範囲の強さ/大きさを意図しています。"
-        return {"answer": answer}
+        text = await ainvoke_with_retry(_answer_chain(llm), _answer_inputs(theme, question, my_word, history))
+        return _parse_answer(text)
     except Exception as e:
-        print(f"Error generating discussion answer: {e}")
+        logger.warning("Error generating discussion answer: %s", e)
+        return {"answer": _DEFAULT_ANSWER}
+
+
+def generate_player_questions_batch(
+    theme: str,
+    last_played_card: int,
+    utterances: dict[str, str],
+    agents_words: dict[str, str],
+    history: str = "",
+    mock_llm=None,
+    utterances_str: str | None = None,
+) -> dict[str, dict]:
+    """Generates one question proposal per player, issuing the requests concurrently."""
+    llm = _get_discussion_llm(mock_llm=mock_llm)
+
+    if llm is None:
+        return {agent_id: {"question": _DEFAULT_PLAYER_QUESTION} for agent_id in agents_words}
+
+    history = truncate_history(history)
+    if utterances_str is None:
+        utterances_str = format_utterances(utterances)
+    texts = _player_question_chain(llm).batch(
+        [
+            _player_question_inputs(theme, last_played_card, utterances_str, my_word, history)
+            for my_word in agents_words.values()
+        ],
+        config={"max_concurrency": _MAX_CONCURRENCY},
+        return_exceptions=True,
+    )
+
+    results: dict[str, dict] = {}
+    for agent_id, text in zip(agents_words, texts):
+        try:
+            if isinstance(text, Exception):
+                raise text
+            results[agent_id] = _parse_question(text, _DEFAULT_PLAYER_QUESTION)
+        except Exception as e:
+            logger.warning("Error generating player discussion question: %s", e)
+            results[agent_id] = {"question": _DEFAULT_PLAYER_QUESTION}
+    return results
+
+
+def generate_answers_batch(
+    theme: str,
+    question: str,
+    agents_words: dict[str, str],
+    history: str = "",
+    mock_llm=None,
+) -> dict[str, dict]:
+    """Generates every player's answer to one question, issuing the requests concurrently."""
+    return generate_answers_for_questions(theme, {"": question}, agents_words, history, mock_llm)[""]
+
+
+def generate_answers_for_questions(
+    theme: str,
+    questions: dict[str, str],
+    agents_words: dict[str, str],
+    history: str = "",
+    mock_llm=None,
+) -> dict[str, dict[str, dict]]:
+    """Generates every player's answer to every question in one concurrent batch.
+
+    ``questions`` maps the asker to the question; the result maps the asker to
+    {agent_id: {"answer": ...}}. All (question, player) requests are
+    independent, so a wait round costs about one round-trip instead of one per
+    question.
+    """
+    llm = _get_discussion_llm(mock_llm=mock_llm)
+
+    if llm is None:
         return {
-            "answer": "私の発言は、直感的にイメージできる範囲の強さ/大きさを意図しています。"
+            owner: {agent_id: {"answer": _DEFAULT_ANSWER} for agent_id in agents_words}
+            for owner in questions
         }
+
+    history = truncate_history(history)
+    texts = _answer_chain(llm).batch(
+        [
+            _answer_inputs(theme, question, my_word, history)
+            for question in questions.values()
+            for my_word in agents_words.values()
+        ],
+        config={"max_concurrency": _MAX_CONCURRENCY},
+        return_exceptions=True,
+    )
+
+    results: dict[str, dict[str, dict]] = {owner: {} for owner in questions}
+    pairs = ((owner, agent_id) for owner in questions for agent_id in agents_words)
+    for (owner, agent_id), text in zip(pairs, texts):
+        try:
+            if isinstance(text, Exception):
+                raise text
+            results[owner][agent_id] = _parse_answer(text)
+        except Exception as e:
+            logger.warning("Error generating discussion answer: %s", e)
+            results[owner][agent_id] = {"answer": _DEFAULT_ANSWER}
+    return results
+
+
+def run_discussion_round(
+    theme: str,
+    last_played_card: int,
+    utterances: dict[str, str],
+    players_words: dict[str, str],
+    history: str = "",
+    mock_llm=None,
+    utterances_str: str | None = None,
+) -> dict[str, dict]:
+    """Generates every player's question and every answer to them with a single LLM call.
+
+    Returns ``{"questions": {agent_id: {"question": ...}}, "answers": {owner:
+    {agent_id: {"answer": ...}}}}`` in the same shapes as the *_batch helpers.
+    A question owner only appears in ``answers`` when every player answered
+    it, so callers can fall back to ``generate_answers_batch`` for the rest.
+    """
+    llm = _get_discussion_llm(mock_llm=mock_llm)
+    agent_ids = list(players_words.keys())
+
+    if llm is None:
+        return {
+            "questions": {agent_id: {"question": _DEFAULT_PLAYER_QUESTION} for agent_id in agent_ids},
+            "answers": {
+                owner: {agent_id: {"answer": _DEFAULT_ANSWER} for agent_id in agent_ids} for owner in agent_ids
+            },
+        }
+
+    questions: dict[str, dict] = {}
+    answers: dict[str, dict[str, dict]] = {}
+    if not agent_ids:
+        return {"questions": questions, "answers": answers}
+
+    history = truncate_history(history)
+    if utterances_str is None:
+        utterances_str = format_utterances(utterances)
+    items = "\n".join(
+        f"### Player {i}: ID={agent_id}, 発言=「{players_words[agent_id]}」"
+        for i, agent_id in enumerate(agent_ids, 1)
+    )
+
+    try:
+        result = parse_json_object(_round_chain(llm).invoke({
+            "theme": theme,
+            "last_played_card": last_played_card,
+            "utterances": utterances_str,
+            "history": history,
+            "items": items,
+        }))
+        for entry in result.get("questions") or []:
+            if not isinstance(entry, dict):
+                continue
+            agent_id = agent_at_index(agent_ids, entry.get("index"))
+            question = str(entry.get("question", "")).strip()
+            if agent_id is not None and question:
+                questions[agent_id] = {"question": question}
+        for entry in result.get("answers") or []:
+            if not isinstance(entry, dict):
+                continue
+            agent_id = agent_at_index(agent_ids, entry.get("index"))
+            owner = agent_at_index(agent_ids, entry.get("question_index"))
+            answer = str(entry.get("answer", "")).strip()
+            if agent_id is not None and owner in questions and answer:
+                answers.setdefault(owner, {})[agent_id] = {"answer": answer}
+    except Exception as e:
+        logger.warning("Error running discussion round: %s", e)
+
+    complete = {owner: by_agent for owner, by_agent in answers.items() if len(by_agent) == len(agent_ids)}
+    return {"questions": questions, "answers": complete}
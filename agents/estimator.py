@@ -1,26 +1,153 @@
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from models.prompts import ESTIMATOR_SYSTEM_PROMPT
-from typing import Dict
-from utils.llm import create_chat_llm, get_provider, get_model
-from utils.parsing import parse_json_object
+import asyncio
+import logging
+import re
+from contextlib import closing
+from contextvars import ContextVar
 
+from models.prompts import (
+    ESTIMATOR_SYSTEM_PROMPT,
+    ESTIMATOR_USER_PROMPT,
+)
+from typing import Any, Dict
+from agents._mock_fast import MOCK_PLAY_BELOW, mock_play_mask
+from models.schemas import EstimatorOutput
+from utils.llm import ainvoke_with_retry, create_chat_llm, env_flag, get_chain, get_model, get_provider, is_mock_mode
+from utils.llm_cache import get_response_cache, is_deterministic, response_cache_key
+from utils.parsing import as_json_object, format_utterances, truncate_history
+from utils.prompting import FormatPrompt
 
-_global_estimator_llm = None
+
+_ESTIMATOR_PROMPT = FormatPrompt(ESTIMATOR_SYSTEM_PROMPT, ESTIMATOR_USER_PROMPT)
+
+logger = logging.getLogger(__name__)
+
+# Process-wide LLM shared by every thread; the ContextVar overrides it per
+# thread/asyncio task so concurrent games can use different models
+_estimator_llm_default: Any = None
+_estimator_llm_var: ContextVar[Any] = ContextVar("estimator_llm", default=None)
+
+# Early-stop (ITO_ESTIMATOR_EARLY_STOP): matches a complete "action" field
+_ACTION_RE = re.compile(r'"action"\s*:\s*"(PLAY|WAIT)"', re.IGNORECASE)
+_ACTION_LOOKBACK = 32
 
 
 def _get_estimator_llm(mock_llm=None):
     """Get or create the estimator LLM instance."""
-    global _global_estimator_llm
-    if _global_estimator_llm is None:
-        _global_estimator_llm = create_chat_llm(role="estimator", temperature=0.0, mock_llm=mock_llm)
-    return _global_estimator_llm
+    llm = _estimator_llm_var.get()
+    if llm is None:
+        llm = _estimator_llm_default
+    if llm is None:
+        if is_mock_mode():
+            # Skip create_chat_llm entirely; a later set_estimator_llm still wins
+            return None
+        llm = create_chat_llm(role="estimator", temperature=0.0, mock_llm=mock_llm)
+        if llm is not None:
+            set_estimator_llm(llm)
+    return llm
+
+
+def set_estimator_llm(llm, *, context_only: bool = False):
+    """Set a custom LLM for the estimator agent.
+
+    By default the LLM is used process-wide, including threads started later.
+    With context_only=True it only applies to the current thread/asyncio task
+    (and tasks or copy_context() runs started from it).
+    """
+    global _estimator_llm_default
+    if context_only:
+        _estimator_llm_var.set(llm)
+    else:
+        _estimator_llm_default = llm
+        _estimator_llm_var.set(None)
+
+
+def _mock_decision(my_number: int, play: bool | None = None) -> dict:
+    # Mock logic: Simple heuristic for testing
+    # If my number is very small (e.g. < 10) or smaller than some threshold relative to others, PLAY.
+    # For simplicity in mock: PLAY if number < MOCK_PLAY_BELOW (20), else WAIT.
+    if play is None:
+        play = my_number < MOCK_PLAY_BELOW
+    action = "PLAY" if play else "WAIT"
+    return {
+        "thought": f"Mock thought: Number is {my_number}, so {action}.",
+        "action": action
+    }
+
+
+def _trivial_decision(last_played_card: int, num_others: int, my_number: int) -> dict | None:
+    """Return a decision that needs no LLM call, or None if the case is not clear-cut.
+
+    Cards are unique, so the answer is certain when nobody else is left or no
+    card can sit between the table and mine (PLAY), and when there are more
+    other players than cards above mine (WAIT). Enabled by ITO_ESTIMATOR_SKIP_TRIVIAL.
+    """
+    if not env_flag("ITO_ESTIMATOR_SKIP_TRIVIAL"):
+        return None
+    if num_others == 0 or my_number == last_played_card + 1:
+        return {"thought": "trivial-play", "action": "PLAY"}
+    if num_others > 100 - my_number:
+        return {"thought": "trivial-wait", "action": "WAIT"}
+    return None
+
+
+def _estimator_chain(llm):
+    return get_chain(_ESTIMATOR_PROMPT, llm, EstimatorOutput)
+
+
+def _decision_inputs(theme, last_played_card, utterances_str, my_number, my_word, history) -> dict:
+    return {
+        "theme": theme,
+        "last_played_card": last_played_card,
+        "utterances": utterances_str,
+        "my_number": my_number,
+        "my_word": my_word,
+        "history": history,
+    }
+
+
+def _parse_decision(text: Any) -> dict:
+    result = as_json_object(text)
+    action = str(result.get("action", "WAIT")).strip().upper()
+    if action not in {"PLAY", "WAIT"}:
+        action = "WAIT"
+    result["action"] = action
+    return result
+
+
+def _stream_decision(llm, inputs: dict) -> dict:
+    """Stream the reply and stop as soon as the action is known.
 
+    The prompt asks for "action" before "thought", so leaving the loop early
+    closes the stream and skips decoding the thought. Falls back to a full
+    parse when no action shows up in the stream.
+    """
+    buffer = ""
+    # The model itself is streamed: the regex needs the raw JSON, and closing a
+    # `llm | StrOutputParser()` stream still drains the model to the end
+    with closing(llm.stream(_ESTIMATOR_PROMPT.invoke(inputs))) as stream:
+        for chunk in stream:
+            # Only rescan the tail; the match may straddle a chunk boundary
+            start = max(0, len(buffer) - _ACTION_LOOKBACK)
+            buffer += chunk.text
+            match = _ACTION_RE.search(buffer, start)
+            if match:
+                return {"thought": "", "action": match.group(1).upper()}
+    return _parse_decision(buffer)
 
-def set_estimator_llm(llm):
-    """Set a custom LLM for the estimator agent."""
-    global _global_estimator_llm
-    _global_estimator_llm = llm
+
+def _cache_key(llm, inputs: dict, early_stop: bool = False):
+    # temperature=0: identical prompts give identical answers, so reuse them
+    if not is_deterministic(llm):
+        return None
+    # The mode is part of the key: early-stop results carry no thought, and
+    # structured output may parse differently from the text chain
+    if early_stop:
+        mode = "early-stop"
+    elif env_flag("ITO_STRUCTURED_OUTPUT"):
+        mode = "structured"
+    else:
+        mode = "text"
+    return response_cache_key(f"estimator:{mode}", llm, _ESTIMATOR_PROMPT.format(**inputs))
 
 
 def decide_action(
@@ -31,41 +158,215 @@ def decide_action(
     my_word: str,
     history: str = "",
     mock_llm=None,
+    utterances_str: str | None = None,
+    exclude: str | None = None,
 ) -> dict:
-    """Decides whether to PLAY or WAIT."""
+    """Decides whether to PLAY or WAIT.
+
+    ``utterances_str`` may carry ``utterances`` already formatted as
+    "agent: word" lines so callers can build it once per turn. ``exclude``
+    names an agent in ``utterances`` to leave out (the deciding agent), so
+    callers can pass the same dict for every agent.
+    """
+    num_others = len(utterances) - (1 if exclude in utterances else 0)
+    trivial = _trivial_decision(last_played_card, num_others, my_number)
+    if trivial is not None:
+        return trivial
+
     llm = _get_estimator_llm(mock_llm=mock_llm)
 
     if llm is None:
-        # Mock logic: Simple heuristic for testing
-        # If my number is very small (e.g. < 10) or smaller than some threshold relative to others, PLAY.
-        # For simplicity in mock: PLAY if number < 20, else WAIT.
-        action = "PLAY" if my_number < 20 else "WAIT"
-        return {
-            "thought": f"Mock thought: Number is {my_number}, so {action}.",
-            "action": action
-        }
+        return _mock_decision(my_number)
+
+    history = truncate_history(history)
+    # Format utterances for prompt (callers may pass a pre-joined string)
+    if utterances_str is None:
+        utterances_str = format_utterances(utterances, exclude=exclude)
+    inputs = _decision_inputs(theme, last_played_card, utterances_str, my_number, my_word, history)
+    early_stop = env_flag("ITO_ESTIMATOR_EARLY_STOP")
+    cache_key = _cache_key(llm, inputs, early_stop)
+    if cache_key is not None:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+    try:
+        if early_stop:
+            result = _stream_decision(llm, inputs)
+        else:
+            result = _parse_decision(_estimator_chain(llm).invoke(inputs))
+        if cache_key is not None:
+            get_response_cache().put(cache_key, dict(result))
+        return result
+    except Exception as e:
+        logger.warning("Error deciding action: %s", e)
+        return {"thought": str(e), "action": "WAIT"}  # Default to WAIT on error
 
-    # Format utterances for prompt
-    utterances_str = "\n".join([f"{agent}: {word}" for agent, word in utterances.items()])
 
-    prompt = ChatPromptTemplate.from_template(ESTIMATOR_SYSTEM_PROMPT)
-    chain = prompt | llm | StrOutputParser()
+async def adecide_action(
+    theme: str,
+    last_played_card: int,
+    utterances: Dict[str, str],
+    my_number: int,
+    my_word: str,
+    history: str = "",
+    mock_llm=None,
+    utterances_str: str | None = None,
+    exclude: str | None = None,
+) -> dict:
+    """Async variant of decide_action (bounded by the shared LLM semaphore)."""
+    num_others = len(utterances) - (1 if exclude in utterances else 0)
+    trivial = _trivial_decision(last_played_card, num_others, my_number)
+    if trivial is not None:
+        return trivial
+
+    llm = _get_estimator_llm(mock_llm=mock_llm)
+
+    if llm is None:
+        return _mock_decision(my_number)
+
+    history = truncate_history(history)
+    # Format utterances for prompt (callers may pass a pre-joined string)
+    if utterances_str is None:
+        utterances_str = format_utterances(utterances, exclude=exclude)
+    inputs = _decision_inputs(theme, last_played_card, utterances_str, my_number, my_word, history)
+    cache_key = _cache_key(llm, inputs)
+    if cache_key is not None:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            return dict(cached)
 
     try:
-        text = chain.invoke({
-            "theme": theme,
-            "last_played_card": last_played_card,
-            "utterances": utterances_str,
-            "my_number": my_number,
-            "my_word": my_word,
-            "history": history,
-        })
-        result = parse_json_object(text)
-        action = str(result.get("action", "WAIT")).strip().upper()
-        if action not in {"PLAY", "WAIT"}:
-            action = "WAIT"
-        result["action"] = action
+        text = await ainvoke_with_retry(_estimator_chain(llm), inputs)
+        result = _parse_decision(text)
+        if cache_key is not None:
+            get_response_cache().put(cache_key, dict(result))
         return result
     except Exception as e:
-        print(f"Error deciding action: {e}")
+        logger.warning("Error deciding action: %s", e)
         return {"thought": str(e), "action": "WAIT"}  # Default to WAIT on error
+
+
+def _split_trivial(last_played_card: int, utterances: Dict[str, str], numbers: Dict[str, int]) -> Dict[str, dict]:
+    """Decisions for the agents in numbers that need no LLM call (see _trivial_decision)."""
+    trivial_results: Dict[str, dict] = {}
+    for agent_id, my_number in numbers.items():
+        num_others = len(utterances) - (1 if agent_id in utterances else 0)
+        trivial = _trivial_decision(last_played_card, num_others, my_number)
+        if trivial is not None:
+            trivial_results[agent_id] = trivial
+    return trivial_results
+
+
+def _agent_decision_inputs(theme, last_played_card, utterances, numbers, agent_ids, history) -> list[dict]:
+    return [
+        _decision_inputs(
+            theme,
+            last_played_card,
+            format_utterances(utterances, exclude=agent_id),
+            numbers[agent_id],
+            utterances.get(agent_id, ""),
+            history,
+        )
+        for agent_id in agent_ids
+    ]
+
+
+def _fill_decisions(results: Dict[str, dict], agent_ids: list[str], texts: list) -> None:
+    """Parse single-agent replies (texts may hold exceptions) into results."""
+    for agent_id, text in zip(agent_ids, texts):
+        try:
+            if isinstance(text, Exception):
+                raise text
+            results[agent_id] = _parse_decision(text)
+        except Exception as e:
+            logger.warning("Error deciding action: %s", e)
+            results[agent_id] = {"thought": str(e), "action": "WAIT"}
+
+
+def decide_actions_batch(
+    theme: str,
+    last_played_card: int,
+    utterances: Dict[str, str],
+    numbers: Dict[str, int],
+    history: str = "",
+    mock_llm=None,
+) -> Dict[str, dict]:
+    """Decides PLAY or WAIT for several agents, one single-agent prompt each.
+
+    ``utterances`` holds the words of every active agent; each agent in
+    ``numbers`` is judged against everyone else's word. Every prompt only
+    holds that agent's own number (one shared prompt would show the model
+    everyone's hand), and the prompts are sent together via ``chain.batch``.
+    Clear-cut agents skip the LLM entirely (see ``_trivial_decision``).
+    """
+    trivial_results = _split_trivial(last_played_card, utterances, numbers)
+    llm = _get_estimator_llm(mock_llm=mock_llm)
+    agent_ids = [agent_id for agent_id in numbers if agent_id not in trivial_results]
+
+    if llm is None:
+        return {
+            agent_id: trivial_results.get(agent_id) or _mock_decision(my_number)
+            for agent_id, my_number in numbers.items()
+        }
+
+    history = truncate_history(history)
+    if not agent_ids:
+        return trivial_results
+
+    results: Dict[str, dict] = {}
+    inputs = _agent_decision_inputs(theme, last_played_card, utterances, numbers, agent_ids, history)
+    texts = _estimator_chain(llm).batch(inputs, return_exceptions=True)
+    _fill_decisions(results, agent_ids, texts)
+
+    results.update(trivial_results)
+    return {agent_id: results[agent_id] for agent_id in numbers}
+
+
+async def adecide_actions_batch(
+    theme: str,
+    last_played_card: int,
+    utterances: Dict[str, str],
+    numbers: Dict[str, int],
+    history: str = "",
+    mock_llm=None,
+) -> Dict[str, dict]:
+    """Async variant of decide_actions_batch (bounded by the shared LLM semaphore).
+
+    The per-agent prompts run concurrently.
+    """
+    trivial_results = _split_trivial(last_played_card, utterances, numbers)
+    llm = _get_estimator_llm(mock_llm=mock_llm)
+    agent_ids = [agent_id for agent_id in numbers if agent_id not in trivial_results]
+
+    if llm is None:
+        return {
+            agent_id: trivial_results.get(agent_id) or _mock_decision(my_number)
+            for agent_id, my_number in numbers.items()
+        }
+
+    history = truncate_history(history)
+    if not agent_ids:
+        return trivial_results
+
+    results: Dict[str, dict] = {}
+    chain = _estimator_chain(llm)
+    inputs = _agent_decision_inputs(theme, last_played_card, utterances, numbers, agent_ids, history)
+    texts = await asyncio.gather(*(ainvoke_with_retry(chain, i) for i in inputs), return_exceptions=True)
+    _fill_decisions(results, agent_ids, texts)
+
+    results.update(trivial_results)
+    return {agent_id: results[agent_id] for agent_id in numbers}
+
+
+def decide_actions_mock_batch(numbers: Dict[str, int]) -> Dict[str, dict]:
+    """Mock decisions for many agents at once, for simulations in mock mode.
+
+    Same answers as ``decide_action``'s mock path, computed in one pass.
+    Trivial-case skipping is not applied here.
+    """
+    plays = mock_play_mask(list(numbers.values()))
+    return {
+        agent_id: _mock_decision(my_number, play)
+        for (agent_id, my_number), play in zip(numbers.items(), plays)
+    }
@@ -1,25 +1,74 @@
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from models.prompts import SPEAKER_SYSTEM_PROMPT
-from utils.llm import create_chat_llm, get_provider, get_model
-from utils.parsing import parse_json_object
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict
 
+from models.schemas import SpeakerOutput
+from models.prompts import (
+    SPEAKER_SYSTEM_PROMPT,
+    SPEAKER_USER_PROMPT,
+    SPEAKER_BATCH_SYSTEM_PROMPT,
+    SPEAKER_BATCH_USER_PROMPT,
+)
+from utils.llm import ainvoke_with_retry, create_chat_llm, get_chain, get_model, get_provider, is_mock_mode
+from utils.parsing import agent_at_index, as_json_object, parse_json_array, truncate_history
+from utils.prompting import FormatPrompt
 
-_global_speaker_llm = None
+
+_SPEAKER_PROMPT = FormatPrompt(SPEAKER_SYSTEM_PROMPT, SPEAKER_USER_PROMPT)
+_SPEAKER_BATCH_PROMPT = FormatPrompt(SPEAKER_BATCH_SYSTEM_PROMPT, SPEAKER_BATCH_USER_PROMPT)
+
+logger = logging.getLogger(__name__)
+
+# Process-wide LLM shared by every thread; the ContextVar overrides it per
+# thread/asyncio task so concurrent games can use different models
+_speaker_llm_default: Any = None
+_speaker_llm_var: ContextVar[Any] = ContextVar("speaker_llm", default=None)
 
 
 def _get_speaker_llm(mock_llm=None):
     """Get or create the speaker LLM instance."""
-    global _global_speaker_llm
-    if _global_speaker_llm is None:
-        _global_speaker_llm = create_chat_llm(role="speaker", temperature=0.7, mock_llm=mock_llm)
-    return _global_speaker_llm
+    llm = _speaker_llm_var.get()
+    if llm is None:
+        llm = _speaker_llm_default
+    if llm is None:
+        if is_mock_mode():
+            # Skip create_chat_llm entirely; a later set_speaker_llm still wins
+            return None
+        llm = create_chat_llm(role="speaker", temperature=0.7, mock_llm=mock_llm)
+        if llm is not None:
+            set_speaker_llm(llm)
+    return llm
+
+
+def set_speaker_llm(llm, *, context_only: bool = False):
+    """Set a custom LLM for the speaker agent.
 
+    By default the LLM is used process-wide, including threads started later.
+    With context_only=True it only applies to the current thread/asyncio task
+    (and tasks or copy_context() runs started from it).
+    """
+    global _speaker_llm_default
+    if context_only:
+        _speaker_llm_var.set(llm)
+    else:
+        _speaker_llm_default = llm
+        _speaker_llm_var.set(None)
 
-def set_speaker_llm(llm):
-    """Set a custom LLM for the speaker agent."""
-    global _global_speaker_llm
-    _global_speaker_llm = llm
+
+def _mock_word(number: int) -> dict:
+    return {
+        "word": f"Mock Word (Number: {number})",
+        "reasoning": "Mock reasoning because API key is missing."
+    }
+
+
+def _speaker_chain(llm):
+    return get_chain(_SPEAKER_PROMPT, llm, SpeakerOutput)
+
+
+def _speaker_batch_chain(llm):
+    return get_chain(_SPEAKER_BATCH_PROMPT, llm)
 
 
 def generate_word(theme: str, number: int, history: str = "", mock_llm=None) -> dict:
@@ -28,13 +77,10 @@ def generate_word(theme: str, number: int, history: str = "", mock_llm=None) ->
 
     if llm is None:
         # Mock logic
-        return {
-            "word": f"Mock Word (Number: {number})",
-            "reasoning": "Mock reasoning because API key is missing."
-        }
+        return _mock_word(number)
 
-    prompt = ChatPromptTemplate.from_template(SPEAKER_SYSTEM_PROMPT)
-    chain = prompt | llm | StrOutputParser()
+    history = truncate_history(history)
+    chain = _speaker_chain(llm)
 
     try:
         text = chain.invoke({
@@ -42,7 +88,148 @@ def generate_word(theme: str, number: int, history: str = "", mock_llm=None) ->
             "number": number,
             "history": history,
         })
-        return parse_json_object(text)
+        return as_json_object(text)
+    except Exception as e:
+        logger.warning("Error generating word: %s", e)
+        return {"word": "Error", "reasoning": str(e)}
+
+
+async def agenerate_word(theme: str, number: int, history: str = "", mock_llm=None) -> dict:
+    """Async variant of generate_word (bounded by the shared LLM semaphore)."""
+    llm = _get_speaker_llm(mock_llm=mock_llm)
+
+    if llm is None:
+        return _mock_word(number)
+
+    history = truncate_history(history)
+    chain = _speaker_chain(llm)
+
+    try:
+        text = await ainvoke_with_retry(chain, {
+            "theme": theme,
+            "number": number,
+            "history": history,
+        })
+        return as_json_object(text)
     except Exception as e:
-        print(f"Error generating word: {e}")
+        logger.warning("Error generating word: %s", e)
         return {"word": "Error", "reasoning": str(e)}
+
+
+def _words_batch_inputs(theme: str, numbers: Dict[str, int], agent_ids: list[str], history: str) -> dict:
+    items = "\n".join(
+        f"### Agent {i}: {numbers[agent_id]}/100" for i, agent_id in enumerate(agent_ids, 1)
+    )
+    return {"theme": theme, "items": items, "history": history}
+
+
+def _parse_words_batch(text: str, agent_ids: list[str]) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    for entry in parse_json_array(text):
+        if not isinstance(entry, dict):
+            continue
+        agent_id = agent_at_index(agent_ids, entry.get("index"))
+        if agent_id is None:
+            continue
+        if "word" in entry:
+            results[agent_id] = {
+                "word": entry.get("word"),
+                "reasoning": entry.get("reasoning", ""),
+            }
+    return results
+
+
+def _fill_missing_words(results: Dict[str, dict], missing: list[str], texts: list) -> None:
+    """Parse the single-agent retries (texts may hold exceptions) into results."""
+    for agent_id, text in zip(missing, texts):
+        try:
+            if isinstance(text, Exception):
+                raise text
+            results[agent_id] = as_json_object(text)
+        except Exception as e:
+            logger.warning("Error generating word: %s", e)
+            results[agent_id] = {"word": "Error", "reasoning": str(e)}
+
+
+def generate_words_batch(
+    theme: str,
+    numbers: Dict[str, int],
+    history: str = "",
+    mock_llm=None,
+) -> Dict[str, dict]:
+    """Generates words for several agents with a single LLM call.
+
+    All agents are packed into one indexed prompt and the model returns a JSON
+    array of per-agent outputs. Agents missing from the reply are retried with
+    the single-agent prompt via ``chain.batch``.
+    """
+    llm = _get_speaker_llm(mock_llm=mock_llm)
+    agent_ids = list(numbers.keys())
+
+    if llm is None:
+        return {agent_id: _mock_word(number) for agent_id, number in numbers.items()}
+
+    history = truncate_history(history)
+    if not agent_ids:
+        return {}
+
+    results: Dict[str, dict] = {}
+    try:
+        text = _speaker_batch_chain(llm).invoke(_words_batch_inputs(theme, numbers, agent_ids, history))
+        results = _parse_words_batch(text, agent_ids)
+    except Exception as e:
+        logger.warning("Error generating words (batch): %s", e)
+
+    missing = [agent_id for agent_id in agent_ids if agent_id not in results]
+    if missing:
+        texts = _speaker_chain(llm).batch(
+            [{"theme": theme, "number": numbers[agent_id], "history": history} for agent_id in missing],
+            return_exceptions=True,
+        )
+        _fill_missing_words(results, missing, texts)
+
+    return {agent_id: results[agent_id] for agent_id in agent_ids}
+
+
+async def agenerate_words_batch(
+    theme: str,
+    numbers: Dict[str, int],
+    history: str = "",
+    mock_llm=None,
+) -> Dict[str, dict]:
+    """Async variant of generate_words_batch (bounded by the shared LLM semaphore).
+
+    Agents missing from the reply are retried concurrently.
+    """
+    llm = _get_speaker_llm(mock_llm=mock_llm)
+    agent_ids = list(numbers.keys())
+
+    if llm is None:
+        return {agent_id: _mock_word(number) for agent_id, number in numbers.items()}
+
+    history = truncate_history(history)
+    if not agent_ids:
+        return {}
+
+    results: Dict[str, dict] = {}
+    try:
+        text = await ainvoke_with_retry(
+            _speaker_batch_chain(llm), _words_batch_inputs(theme, numbers, agent_ids, history)
+        )
+        results = _parse_words_batch(text, agent_ids)
+    except Exception as e:
+        logger.warning("Error generating words (batch): %s", e)
+
+    missing = [agent_id for agent_id in agent_ids if agent_id not in results]
+    if missing:
+        chain = _speaker_chain(llm)
+        texts = await asyncio.gather(
+            *(
+                ainvoke_with_retry(chain, {"theme": theme, "number": numbers[agent_id], "history": history})
+                for agent_id in missing
+            ),
+            return_exceptions=True,
+        )
+        _fill_missing_words(results, missing, texts)
+
+    return {agent_id: results[agent_id] for agent_id in agent_ids}
@@ -5,14 +5,44 @@ This module provides a LangGraph-based implementation that preserves all Ito gam
 functionality while allowing GRPO framework integration.
 """
 
+import asyncio
+import importlib
+from functools import partial
 from typing import Dict, List, Optional, Literal, Any
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
-from models.schemas import GameState
-from utils.deck import create_deck, draw_card
+from langgraph.types import Overwrite
+from models.schemas import APPENDED_FIELDS, GameState
+from utils.deck import deal_hands
+from utils.llm import is_mock_mode
+from utils.parsing import format_utterances, join_history, normalize_question
 from models.themes import THEMES_JA
 import random
 
 
+# Agent functions the nodes call, as {attribute: (module, function)}. They are
+# imported on first use (see ItoGameGraph.__getattr__), so building a graph
+# does not load the agent modules; assigning the attribute overrides one.
+_AGENT_FUNCTIONS = {
+    "speaker_generate_word": ("agents.speaker", "generate_word"),
+    "speaker_agenerate_word": ("agents.speaker", "agenerate_word"),
+    "speaker_generate_words_batch": ("agents.speaker", "generate_words_batch"),
+    "speaker_agenerate_words_batch": ("agents.speaker", "agenerate_words_batch"),
+    "estimator_decide_action": ("agents.estimator", "decide_action"),
+    "estimator_adecide_action": ("agents.estimator", "adecide_action"),
+    "estimator_decide_actions_batch": ("agents.estimator", "decide_actions_batch"),
+    "estimator_adecide_actions_batch": ("agents.estimator", "adecide_actions_batch"),
+    "estimator_decide_actions_mock_batch": ("agents.estimator", "decide_actions_mock_batch"),
+    "discussion_generate_question": ("agents.discussion", "generate_question"),
+    "discussion_generate_player_question": ("agents.discussion", "generate_player_question"),
+    "discussion_generate_answer": ("agents.discussion", "generate_answer"),
+    "discussion_generate_player_questions_batch": ("agents.discussion", "generate_player_questions_batch"),
+    "discussion_generate_answers_batch": ("agents.discussion", "generate_answers_batch"),
+    "discussion_generate_answers_for_questions": ("agents.discussion", "generate_answers_for_questions"),
+    "discussion_run_round": ("agents.discussion", "run_discussion_round"),
+}
+
+
 class ItoGameGraph:
     """
     LangGraph-based Ito game implementation.
@@ -29,6 +59,8 @@ class ItoGameGraph:
         max_turns: int = 20,
         debug: bool = False,
         reveal_hands: bool = False,
+        batch_prompting: bool = False,
+        mock_fast: bool = False,
     ):
         self.agent_ids = agent_ids
         self.human_agent_id = human_agent_id
@@ -36,34 +68,34 @@ class ItoGameGraph:
         self.max_turns = max_turns
         self.debug = debug
         self.reveal_hands = reveal_hands
-
-        # Import agents here to avoid circular imports
-        from agents.speaker import generate_word as speaker_generate_word
-        from agents.estimator import decide_action as estimator_decide_action
-        from agents.discussion import (
-            generate_question as discussion_generate_question,
-            generate_player_question as discussion_generate_player_question,
-            generate_answer as discussion_generate_answer,
-        )
-
-        self.speaker_generate_word = speaker_generate_word
-        self.estimator_decide_action = estimator_decide_action
-        self.discussion_generate_question = discussion_generate_question
-        self.discussion_generate_player_question = discussion_generate_player_question
-        self.discussion_generate_answer = discussion_generate_answer
+        self.batch_prompting = batch_prompting
+        self.mock_fast = mock_fast
 
         # Build graph
         self._graph = self._build_graph()
         self.app = self._graph.compile()
 
+    def __getattr__(self, name: str) -> Any:
+        # Only called for missing attributes: import the agent function once
+        # and cache it on the instance
+        try:
+            module_name, func_name = _AGENT_FUNCTIONS[name]
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}") from None
+        func = getattr(importlib.import_module(module_name), func_name)
+        setattr(self, name, func)
+        return func
+
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph workflow."""
         workflow = StateGraph(GameState)
 
         # Add nodes
         workflow.add_node("setup", self._setup_node)
-        workflow.add_node("speaking", self._speaking_node)
-        workflow.add_node("voting", self._voting_node)
+        # Sync runs (run/invoke) use the sequential nodes; arun/ainvoke await the
+        # concurrent twins, which issue every AI agent's LLM call at once
+        workflow.add_node("speaking", RunnableLambda(self._speaking_node, afunc=self._aspeaking_node))
+        workflow.add_node("voting", RunnableLambda(self._voting_node, afunc=self._avoting_node))
         workflow.add_node("execute_play", self._execute_play_node)
         workflow.add_node("wait_round", self._wait_round_node)
 
@@ -113,15 +145,13 @@ class ItoGameGraph:
         agents = state.get("agents") or self.agent_ids
 
         # Keep pre-dealt hands when a complete hand mapping is provided.
-        provided_hands = state.get("hands", {})
-        if isinstance(provided_hands, dict) and set(provided_hands.keys()) == set(agents):
+        provided_hands = state.get("hands") or {}
+        # (dict keys views compare as sets, so only the agents side is built)
+        if isinstance(provided_hands, dict) and provided_hands.keys() == frozenset(agents):
             hands = dict(provided_hands)
-            deck = [card for card in create_deck() if card not in set(hands.values())]
+            deck = []  # as in deal_hands: nothing is drawn after the deal
         else:
-            deck = create_deck()
-            hands = {}
-            for agent in agents:
-                hands[agent] = draw_card(deck)
+            hands, deck = deal_hands(agents)
 
         # Select theme
         theme_override = (state.get("theme_override") or "").strip()
@@ -134,11 +164,12 @@ class ItoGameGraph:
             history = [f"ゲーム開始。お題: {theme}"]
 
         # Create new state with all fields
-        new_state = dict(state)
-        new_state.update({
+        new_state = {
+            **state,
             "theme": theme,
-            "history": history,
-            "played_cards": [],
+            # Overwrite: setup resets these instead of appending to the input
+            "history": Overwrite(history),
+            "played_cards": Overwrite([]),
             "last_played_card": 0,
             "utterances": {},
             "turn_count": 0,
@@ -146,14 +177,14 @@ class ItoGameGraph:
             "deck": deck,
             "agents": agents,
             "votes": {},
-            "finished_agents": [],
+            "finished_agents": Overwrite([]),
             "speaker_reasonings": {},
             "estimator_thoughts": {},
             "debug": self.debug,
             "reveal": self.reveal_hands,
             "theme_override": theme_override,
-            "hands": hands
-        })
+            "hands": hands,
+        }
 
         if self.debug:
             print(f"Theme: {theme}")
@@ -163,37 +194,113 @@ class ItoGameGraph:
 
         return new_state
 
+    def _ai_numbers(self, state: GameState) -> Dict[str, int]:
+        """Cards of the AI agents still in the game, in seating order."""
+        hands = state.get("hands") or {}
+        finished = frozenset(state.get("finished_agents") or ())
+        return {
+            agent_id: hands[agent_id]
+            for agent_id in state["agents"]
+            if agent_id not in finished and agent_id != self.human_agent_id
+        }
+
+    def _active_utterances(self, state: GameState) -> Dict[str, str]:
+        """Utterances of the agents still in the game."""
+        finished = frozenset(state.get("finished_agents") or ())
+        return {k: v for k, v in state["utterances"].items() if k not in finished}
+
     def _speaking_node(self, state: GameState) -> GameState:
         """All agents generate words based on their cards."""
         if self.debug:
             print("--- Speaking Node ---")
-        
+
+        history_text = join_history(state.get("history") or [])
+
+        # Batch prompting: one LLM call for every AI agent in this turn
+        ai_results = {}
+        if self.batch_prompting:
+            ai_results = self.speaker_generate_words_batch(
+                state["theme"], self._ai_numbers(state), history=history_text
+            )
+        return self._finish_speaking(state, history_text, ai_results)
+
+    async def _aspeaking_node(self, state: GameState) -> GameState:
+        """Async speaking node: every AI agent's word is requested concurrently."""
+        if self.debug:
+            print("--- Speaking Node ---")
+
         theme = state["theme"]
-        hands = state.get("hands", {})
+        history_text = join_history(state.get("history") or [])
+        ai_numbers = self._ai_numbers(state)
+
+        async def ai_words() -> Dict[str, dict]:
+            if self.batch_prompting:
+                return await self.speaker_agenerate_words_batch(theme, ai_numbers, history=history_text)
+            words = await asyncio.gather(
+                *(self.speaker_agenerate_word(theme, card, history=history_text) for card in ai_numbers.values())
+            )
+            return dict(zip(ai_numbers, words))
+
+        human_card = self._human_card(state)
+        ask = None if human_card is None else partial(self._ask_human_word, theme, human_card)
+        human_word, ai_results = await self._with_human_input(ask, ai_words())
+        return self._finish_speaking(state, history_text, ai_results, human_word)
+
+    def _human_card(self, state: GameState) -> Optional[int]:
+        """The human agent's card while they are still in the game, else None."""
+        if self.human_agent_id is None or self.human_agent_id in (state.get("finished_agents") or ()):
+            return None
+        hands = state.get("hands") or {}
+        return hands.get(self.human_agent_id)
+
+    def _ask_human_word(self, theme: str, card: int) -> str:
+        print(f"\n=== {self.human_agent_id} の番 ===")
+        print(f"お題: {theme}")
+        print(f"あなたの数字（秘密）: {card}/100")
+        word = input("数字を言わずに、度合いを表す単語/短いフレーズを入力してください: ").strip()
+        return word or "（無言）"
+
+    async def _with_human_input(self, ask, ai_call):
+        """Run ai_call while the human types, if there is a prompt to ask.
+
+        input() runs in a worker thread, so the AI agents' LLM calls overlap
+        the human's thinking time. Returns (human answer or None, AI result).
+        """
+        if ask is None:
+            return None, await ai_call
+        return await asyncio.gather(asyncio.to_thread(ask), ai_call)
+
+    def _finish_speaking(
+        self, state: GameState, history_text: str, ai_results: Dict[str, dict], human_word: Optional[str] = None
+    ) -> GameState:
+        """Collect every agent's word; AI agents missing from ai_results are asked now.
+
+        human_word is the human's already-entered word (asked here when None).
+        """
+        theme = state["theme"]
+        hands = state.get("hands") or {}
         utterances = {}
-        speaker_reasonings = dict(state.get("speaker_reasonings", {}))
+        speaker_reasonings = dict(state.get("speaker_reasonings") or {})
+        finished = frozenset(state.get("finished_agents") or ())
         
         history_update = []
-        history_text = "\n".join(state.get("history", []))
         
         for agent_id in state["agents"]:
-            if agent_id in state.get("finished_agents", []):
+            if agent_id in finished:
                 continue
             
             card = hands[agent_id]
             
             # Human agent input
             if agent_id == self.human_agent_id:
-                print(f"\n=== {agent_id} の番 ===")
-                print(f"お題: {theme}")
-                print(f"あなたの数字（秘密）: {card}/100")
-                word = input("数字を言わずに、度合いを表す単語/短いフレーズを入力してください: ").strip()
-                if not word:
-                    word = "（無言）"
+                word = human_word if human_word is not None else self._ask_human_word(theme, card)
                 speaker_reasonings[agent_id] = ""
             else:
                 # AI agent
-                result = self.speaker_generate_word(theme, card, history=history_text)
+                if agent_id in ai_results:
+                    result = ai_results[agent_id]
+                else:
+                    result = self.speaker_generate_word(theme, card, history=history_text)
                 word = result.get("word", "Error")
                 speaker_reasonings[agent_id] = str(result.get("reasoning", ""))
 
@@ -211,52 +318,140 @@ class ItoGameGraph:
             history_update.append(f"{agent_id} の発言: 『{word}』")
 
         # Return updated state
-        new_state = dict(state)
-        new_state["utterances"] = utterances
-        new_state["speaker_reasonings"] = speaker_reasonings
-        new_state["history"] = state["history"] + history_update
+        new_state = {
+            "utterances": utterances,
+            "speaker_reasonings": speaker_reasonings,
+            "history": history_update,
+        }
         
         return new_state
 
+    def _utterance_lines(self, active_utterances: Dict[str, str]) -> Dict[str, str]:
+        """Each active agent's "agent: word" line, formatted once per turn.
+
+        Agents' estimator prompts only differ by which line is left out.
+        """
+        return {k: f"{k}: {v}" for k, v in active_utterances.items()}
+
+    def _batch_votes(self, state: GameState, history_text: str) -> Dict[str, dict]:
+        """Decide every AI vote at once when batch prompting or mock_fast applies, else {}."""
+        # Batch prompting: every AI agent's single-agent prompt is sent together
+        # (mock_fast: one mock pass under ITO_FORCE_MOCK instead)
+        use_mock_fast = self.mock_fast and is_mock_mode()
+        if not (self.batch_prompting or use_mock_fast):
+            return {}
+        ai_numbers = self._ai_numbers(state)
+        if use_mock_fast:
+            return self.estimator_decide_actions_mock_batch(ai_numbers)
+        active_utterances = self._active_utterances(state)
+        return self.estimator_decide_actions_batch(
+            state["theme"], state["last_played_card"], active_utterances, ai_numbers, history=history_text
+        )
+
     def _voting_node(self, state: GameState) -> GameState:
         """All agents decide whether to PLAY or WAIT."""
         if self.debug:
             print("--- Voting Node ---")
-        
-        hands = state.get("hands", {})
+
+        history_text = join_history(state.get("history") or [])
+        return self._finish_voting(state, history_text, self._batch_votes(state, history_text))
+
+    async def _avoting_node(self, state: GameState) -> GameState:
+        """Async voting node: every AI agent's decision is requested concurrently."""
+        if self.debug:
+            print("--- Voting Node ---")
+
+        history_text = join_history(state.get("history") or [])
+        utterances = state["utterances"]
+        active_utterances = self._active_utterances(state)
+        ai_numbers = self._ai_numbers(state)
+
+        if self.mock_fast and is_mock_mode():
+            return self._finish_voting(state, history_text, self._batch_votes(state, history_text))
+
+        async def ai_votes() -> Dict[str, dict]:
+            if self.batch_prompting:
+                return await self.estimator_adecide_actions_batch(
+                    state["theme"], state["last_played_card"], active_utterances, ai_numbers, history=history_text
+                )
+            utterance_lines = self._utterance_lines(active_utterances)
+            decisions = await asyncio.gather(*(
+                self.estimator_adecide_action(
+                    state["theme"],
+                    state["last_played_card"],
+                    active_utterances,
+                    card,
+                    utterances.get(agent_id, ""),
+                    history=history_text,
+                    utterances_str="\n".join(line for k, line in utterance_lines.items() if k != agent_id),
+                    exclude=agent_id,
+                )
+                for agent_id, card in ai_numbers.items()
+            ))
+            return dict(zip(ai_numbers, decisions))
+
+        ask = None
+        if self._human_card(state) is not None:
+            human_others = {k: v for k, v in active_utterances.items() if k != self.human_agent_id}
+            ask = partial(self._ask_human_vote, state["last_played_card"], human_others)
+        human_vote, ai_results = await self._with_human_input(ask, ai_votes())
+        return self._finish_voting(state, history_text, ai_results, human_vote)
+
+    def _ask_human_vote(self, last_played: int, other_utterances: Dict[str, str]) -> str:
+        print(f"\n=== {self.human_agent_id} の判断 ===")
+        print(f"場の最大値: {last_played}")
+        if other_utterances:
+            print("他プレイヤーの発言:")
+            for k, v in other_utterances.items():
+                print(f"- {k}: {v}")
+        else:
+            print("他プレイヤーの発言: (なし)")
+
+        raw = input("今出すなら PLAY / 待つなら WAIT を入力: ").strip().upper()
+        return "PLAY" if raw == "PLAY" else "WAIT"
+
+    def _finish_voting(
+        self, state: GameState, history_text: str, ai_results: Dict[str, dict], human_vote: Optional[str] = None
+    ) -> GameState:
+        """Collect every agent's vote; AI agents missing from ai_results are asked now.
+
+        human_vote is the human's already-entered vote (asked here when None).
+        """
+        hands = state.get("hands") or {}
         utterances = state["utterances"]
         theme = state["theme"]
         last_played = state["last_played_card"]
         
         votes = {}
         estimator_thoughts = {}
-        history_text = "\n".join(state.get("history", []))
+        finished = frozenset(state.get("finished_agents") or ())
+        active_utterances = self._active_utterances(state)
+        utterance_lines = self._utterance_lines(active_utterances)
         
         for agent_id in state["agents"]:
-            if agent_id in state.get("finished_agents", []):
+            if agent_id in finished:
                 continue
             
             card = hands[agent_id]
             word = utterances.get(agent_id, "")
-            other_utterances = {k: v for k, v in utterances.items() if k != agent_id and k not in state.get("finished_agents", [])}
             
             # Human agent input
             if agent_id == self.human_agent_id:
-                print(f"\n=== {agent_id} の判断 ===")
-                print(f"場の最大値: {last_played}")
-                if other_utterances:
-                    print("他プレイヤーの発言:")
-                    for k, v in other_utterances.items():
-                        print(f"- {k}: {v}")
-                else:
-                    print("他プレイヤーの発言: (なし)")
-
-                raw = input("今出すなら PLAY / 待つなら WAIT を入力: ").strip().upper()
-                votes[agent_id] = "PLAY" if raw == "PLAY" else "WAIT"
+                if human_vote is None:
+                    other_utterances = {k: v for k, v in active_utterances.items() if k != agent_id}
+                    human_vote = self._ask_human_vote(last_played, other_utterances)
+                votes[agent_id] = human_vote
                 estimator_thoughts[agent_id] = ""
             else:
                 # AI agent
-                decision = self.estimator_decide_action(theme, last_played, other_utterances, card, word, history=history_text)
+                if agent_id in ai_results:
+                    decision = ai_results[agent_id]
+                else:
+                    others_str = "\n".join(line for k, line in utterance_lines.items() if k != agent_id)
+                    decision = self.estimator_decide_action(
+                        theme, last_played, active_utterances, card, word,
+                        history=history_text, utterances_str=others_str, exclude=agent_id,
+                    )
                 votes[agent_id] = str(decision.get("action", "WAIT")).strip().upper()
                 if votes[agent_id] not in {"PLAY", "WAIT"}:
                     votes[agent_id] = "WAIT"
@@ -270,15 +465,13 @@ class ItoGameGraph:
             print(f"{agent_id} の投票: {votes[agent_id]}")
         
         # Return updated state
-        new_state = dict(state)
-        new_state["votes"] = votes
-        new_state["estimator_thoughts"] = estimator_thoughts
+        new_state = {"votes": votes, "estimator_thoughts": estimator_thoughts}
         
         return new_state
 
     def _router_node(self, state: GameState) -> Literal["execute_play", "wait_round"]:
         """Routes based on votes."""
-        votes = state.get("votes", {})
+        votes = state.get("votes") or {}
         play_candidates = [agent for agent, action in votes.items() if action == "PLAY"]
         
         if play_candidates:
@@ -291,8 +484,8 @@ class ItoGameGraph:
         if self.debug:
             print("--- Execute Play Node ---")
         
-        votes = state.get("votes", {})
-        hands = state.get("hands", {})
+        votes = state.get("votes") or {}
+        hands = state.get("hands") or {}
         play_candidates = [agent for agent, action in votes.items() if action == "PLAY"]
         
         # Tie-breaking: Smallest card plays first
@@ -301,26 +494,25 @@ class ItoGameGraph:
         
         print(f"!!! {player} がカードを出します: {card} !!!")
         
-        new_played = state["played_cards"] + [card]
-        finished = state.get("finished_agents", []) + [player]
-        
         # Check for failure
         if card < state["last_played_card"]:
             status = "FAILED"
             print(f"ゲームオーバー: {card} は {state['last_played_card']} より小さい")
-        elif len(finished) == len(state["agents"]):
+        elif len(state.get("finished_agents") or ()) + 1 == len(state["agents"]):
             status = "SUCCESS"
             print("ゲームクリア！ すべて昇順で出せました。")
         else:
             status = "ACTIVE"
         
         # Return updated state
-        new_state = dict(state)
-        new_state["played_cards"] = new_played
-        new_state["last_played_card"] = card
-        new_state["finished_agents"] = finished
-        new_state["history"] = state["history"] + [f"{player} が {card} を出した。"]
-        new_state["status"] = status
+        # played_cards, finished_agents and history are appended by their reducers
+        new_state = {
+            "played_cards": [card],
+            "last_played_card": card,
+            "finished_agents": [player],
+            "history": [f"{player} が {card} を出した。"],
+            "status": status,
+        }
         
         return new_state
 
@@ -333,38 +525,60 @@ class ItoGameGraph:
 
         theme = state["theme"]
         last_played = state["last_played_card"]
-        utterances = state.get("utterances", {})
-        history_text = "\n".join(state.get("history", []))
+        utterances = state.get("utterances") or {}
+        history_text = join_history(state.get("history") or [])
+        utterances_str = format_utterances(utterances)
 
         # Get finished agents to exclude them
-        finished_agents = state.get("finished_agents", [])
-        active_agents = [a for a in state.get("agents", []) if a not in finished_agents]
+        finished_agents = frozenset(state.get("finished_agents") or ())
+        active_agents = [a for a in (state.get("agents") or []) if a not in finished_agents]
         
-        # Everyone proposes a question (avoid duplicates)
+        # Everyone proposes a question (duplicates compared by normalize_question)
         proposals: dict[str, str] = {}
         seen_questions: set[str] = set()
+
+        # AI players' proposals are requested concurrently
+        ai_words = {
+            agent_id: str(utterances.get(agent_id, "")).strip()
+            for agent_id in active_agents
+            if agent_id != self.human_agent_id
+        }
+        # Batch prompting: the AI players' questions and answers come from one LLM call
+        fused_answers: dict[str, dict] = {}
+        if self.batch_prompting:
+            fused = self.discussion_run_round(
+                theme, last_played, utterances, ai_words, history=history_text, utterances_str=utterances_str
+            )
+            ai_questions = fused["questions"]
+            fused_answers = fused["answers"]
+        else:
+            ai_questions = self.discussion_generate_player_questions_batch(
+                theme, last_played, utterances, ai_words, history=history_text, utterances_str=utterances_str
+            )
         
         for agent_id in active_agents:
-            my_word = str(utterances.get(agent_id, "")).strip()
-
             if agent_id == self.human_agent_id:
                 q_in = input("あなたの質問（空ならスキップ）: ").strip()
-                if q_in and q_in not in seen_questions:
+                q_key = normalize_question(q_in)
+                if q_key and q_key not in seen_questions:
                     proposals[agent_id] = q_in
-                    seen_questions.add(q_in)
+                    seen_questions.add(q_key)
                     print(f"{agent_id} の質問: {q_in}")
                 continue
 
-            q_obj = self.discussion_generate_player_question(theme, last_played, utterances, my_word, history=history_text) or {}
+            q_obj = ai_questions.get(agent_id) or {}
             q_text = str(q_obj.get("question", "")).strip()
-            if q_text and q_text not in seen_questions:
+            q_key = normalize_question(q_text)
+            if q_key and q_key not in seen_questions:
                 proposals[agent_id] = q_text
-                seen_questions.add(q_text)
+                seen_questions.add(q_key)
                 print(f"{agent_id} の質問: {q_text}")
 
         # If nobody proposed, fallback to moderator-style question
         if not proposals:
-            q_obj = self.discussion_generate_question(theme, last_played, utterances, history=history_text) or {}
+            q_obj = self.discussion_generate_question(
+                theme, last_played, utterances, history=history_text, utterances_str=utterances_str
+            ) or {}
             q_text = str(q_obj.get("question", "")).strip()
             if q_text:
                 proposals["(moderator)"] = q_text
@@ -374,17 +588,26 @@ class ItoGameGraph:
 
         history_update = ["全員WAIT。"]
 
+        proposals = {q_owner: str(q).strip() for q_owner, q in proposals.items()}
+        # Answers the fused round did not cover are requested all at once
+        pending = {
+            q_owner: q for q_owner, q in proposals.items() if q and q_owner not in fused_answers
+        }
+        if pending and ai_words:
+            fused_answers.update(self.discussion_generate_answers_for_questions(
+                theme, pending, ai_words, history=history_text
+            ))
+
         # Everyone answers everyone's questions (only active agents answer)
         for q_owner, q in proposals.items():
-            q = str(q).strip()
             if not q:
                 continue
             print(f"\n質問（{q_owner}）: {q}")
             history_update.append(f"質問（{q_owner}）: {q}")
 
-            for agent_id in active_agents:
-                my_word = str(state.get("utterances", {}).get(agent_id, "")).strip()
+            ai_answers = fused_answers.get(q_owner, {})
 
+            for agent_id in active_agents:
                 if agent_id == self.human_agent_id:
                     ans = input(f"あなたの回答（質問者={q_owner}）: ").strip()
                     if ans:
@@ -392,7 +615,7 @@ class ItoGameGraph:
                         print(f"{agent_id} の回答: {ans}")
                     continue
 
-                a = self.discussion_generate_answer(theme, q, my_word, history=history_text).get("answer", "")
+                a = (ai_answers.get(agent_id) or {}).get("answer", "")
                 a = str(a).strip()
                 if a:
                     history_update.append(f"{agent_id} の回答（質問者={q_owner}）: {a}")
@@ -401,20 +624,19 @@ class ItoGameGraph:
         next_turn = state.get("turn_count", 0) + 1
         if next_turn >= self.max_turns:
             print("停滞が続いたためゲームを終了します。")
-            new_state = dict(state)
-            new_state["history"] = state["history"] + history_update + ["停滞が続いたため終了。"]
-            new_state["turn_count"] = next_turn
-            new_state["votes"] = {}
-            new_state["status"] = "FAILED"
-            return new_state
+            return {
+                "history": history_update + ["停滞が続いたため終了。"],
+                "turn_count": next_turn,
+                "votes": {},
+                "status": "FAILED",
+            }
 
         # Return updated state
-        new_state = dict(state)
-        new_state["history"] = state["history"] + history_update
-        new_state["turn_count"] = next_turn
-        new_state["votes"] = {}
-        
-        return new_state
+        return {
+            "history": history_update,
+            "turn_count": next_turn,
+            "votes": {},
+        }
 
     def _check_game_end(self, state: GameState) -> Literal["end", "voting"]:
         """Check if game should end."""
@@ -422,6 +644,62 @@ class ItoGameGraph:
             return "end"
         return "voting"
 
+    def _initial_state(self, initial_state: Optional[GameState]) -> GameState:
+        if initial_state is None:
+            initial_state = GameState(
+                agents=self.agent_ids,
+                debug=self.debug,
+                reveal=self.reveal_hands,
+                theme_override=self.theme or "",
+            )
+        return initial_state
+
+    def _report(self, output: Dict[str, Any], final_state: GameState, verbose: bool) -> GameState:
+        """Print one streamed node update and merge it into final_state.
+
+        The graph is streamed in "updates" mode, so each output holds only the
+        keys a node changed; list fields with a reducer are appended here the
+        same way the graph appends them.
+        """
+        for key, value in output.items():
+            if verbose and self.debug:
+                print(f"\n--- Node: {key} ---")
+
+            if value is None:
+                continue
+
+            for field, update in value.items():
+                if isinstance(update, Overwrite):
+                    final_state[field] = list(update.value)
+                elif field in APPENDED_FIELDS:
+                    final_state.setdefault(field, []).extend(update)
+                else:
+                    final_state[field] = update
+
+            if value.get("history"):
+                if verbose or self.debug:
+                    print(final_state["history"][-1])
+
+            status = final_state.get("status")
+            if status is not None:
+                if verbose or status != "ACTIVE":
+                    print(f"Status: {status}")
+        return final_state
+
+    def _quiet_result(self, final_state: GameState) -> GameState:
+        """Print the one line _report would show when not verbose (a finished game's status)."""
+        status = final_state.get("status")
+        if status is not None and status != "ACTIVE":
+            print(f"Status: {status}")
+        return final_state
+
+    def _start_state(self, initial_state: Optional[GameState]) -> GameState:
+        """The initial state, with private copies of the lists _report extends."""
+        state = dict(self._initial_state(initial_state))
+        for field in APPENDED_FIELDS & state.keys():
+            state[field] = list(state[field])
+        return state
+
     def run(self, initial_state: Optional[GameState] = None, verbose: bool = True) -> GameState:
         """
         Run the game to completion.
@@ -434,37 +712,38 @@ class ItoGameGraph:
             The final game state
         """
         # Build initial state
-        if initial_state is None:
-            initial_state = GameState(
-                agents=self.agent_ids,
-                debug=self.debug,
-                reveal=self.reveal_hands,
-                theme_override=self.theme or "",
-            )
+        initial_state = self._initial_state(initial_state)
         
+        # Nothing per-node to print: skip streaming altogether
+        if not verbose and not self.debug:
+            return self._quiet_result(self.app.invoke(initial_state))
+
         # Run graph
-        final_state = initial_state
-        for output in self.app.stream(initial_state):
-            # Each output contains the updated state after a node execution
-            for key, value in output.items():
-                if verbose and self.debug:
-                    print(f"\n--- Node: {key} ---")
-                
-                # Update final_state with the latest state
-                if value is not None:
-                    final_state = value
-                    
-                    if value is not None and "history" in value:
-                        if len(value["history"]) > 0:
-                            if verbose or self.debug:
-                                print(value["history"][-1])
-                    
-                    if value is not None and "status" in value:
-                        if verbose or value["status"] != "ACTIVE":
-                            print(f"Status: {value['status']}")
+        final_state = self._start_state(initial_state)
+        for output in self.app.stream(initial_state, stream_mode="updates"):
+            final_state = self._report(output, final_state, verbose)
         
         return final_state
 
+    async def arun(self, initial_state: Optional[GameState] = None, verbose: bool = True) -> GameState:
+        """
+        Async variant of run().
+
+        The speaking and voting nodes issue all AI agents' LLM calls
+        concurrently, so a turn costs about one round-trip instead of one per
+        agent.
+        """
+        initial_state = self._initial_state(initial_state)
+
+        if not verbose and not self.debug:
+            return self._quiet_result(await self.app.ainvoke(initial_state))
+
+        final_state = self._start_state(initial_state)
+        async for output in self.app.astream(initial_state, stream_mode="updates"):
+            final_state = self._report(output, final_state, verbose)
+
+        return final_state
+
     def get_app(self):
         """Get the compiled LangGraph application for advanced usage."""
         return self.app
@@ -477,6 +756,8 @@ def create_game_graph(
     max_turns: int = 20,
     debug: bool = False,
     reveal_hands: bool = False,
+    batch_prompting: bool = False,
+    mock_fast: bool = False,
 ) -> ItoGameGraph:
     """
     Convenience function to create an ItoGameGraph instance.
@@ -488,6 +769,9 @@ def create_game_graph(
         max_turns: Maximum turns before game ends due to stagnation
         debug: Enable debug output
         reveal_hands: Show all players' hands (debugging)
+        batch_prompting: Generate all AI agents' words/discussion with one LLM call per turn
+            (votes keep one prompt per agent, sent together, so no hand is shown to another agent)
+        mock_fast: Under ITO_FORCE_MOCK, decide all mock votes in one pass (simulations)
         
     Returns:
         An ItoGameGraph instance
@@ -499,6 +783,8 @@ def create_game_graph(
         max_turns=max_turns,
         debug=debug,
         reveal_hands=reveal_hands,
+        batch_prompting=batch_prompting,
+        mock_fast=mock_fast,
     )
 
 
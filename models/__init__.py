@@ -1,21 +1,52 @@
 # Empty __init__ for models package
-from .schemas import GameState, AgentState
+from .schemas import (
+    GameState,
+    AgentState,
+    APPENDED_FIELDS,
+    SpeakerOutput,
+    EstimatorOutput,
+    QuestionOutput,
+    AnswerOutput,
+)
 from .prompts import (
     SPEAKER_SYSTEM_PROMPT,
+    SPEAKER_USER_PROMPT,
     ESTIMATOR_SYSTEM_PROMPT,
+    ESTIMATOR_USER_PROMPT,
     DISCUSSION_SYSTEM_PROMPT,
+    DISCUSSION_USER_PROMPT,
     DISCUSSION_PLAYER_QUESTION_SYSTEM_PROMPT,
+    DISCUSSION_PLAYER_QUESTION_USER_PROMPT,
     DISCUSSION_ANSWER_SYSTEM_PROMPT,
+    DISCUSSION_ANSWER_USER_PROMPT,
+    SPEAKER_BATCH_SYSTEM_PROMPT,
+    SPEAKER_BATCH_USER_PROMPT,
+    DISCUSSION_ROUND_SYSTEM_PROMPT,
+    DISCUSSION_ROUND_USER_PROMPT,
 )
 from .themes import THEMES_JA
 
 __all__ = [
     "GameState",
     "AgentState",
+    "APPENDED_FIELDS",
+    "SpeakerOutput",
+    "EstimatorOutput",
+    "QuestionOutput",
+    "AnswerOutput",
     "SPEAKER_SYSTEM_PROMPT",
+    "SPEAKER_USER_PROMPT",
     "ESTIMATOR_SYSTEM_PROMPT",
+    "ESTIMATOR_USER_PROMPT",
     "DISCUSSION_SYSTEM_PROMPT",
+    "DISCUSSION_USER_PROMPT",
     "DISCUSSION_PLAYER_QUESTION_SYSTEM_PROMPT",
+    "DISCUSSION_PLAYER_QUESTION_USER_PROMPT",
     "DISCUSSION_ANSWER_SYSTEM_PROMPT",
+    "DISCUSSION_ANSWER_USER_PROMPT",
+    "SPEAKER_BATCH_SYSTEM_PROMPT",
+    "SPEAKER_BATCH_USER_PROMPT",
+    "DISCUSSION_ROUND_SYSTEM_PROMPT",
+    "DISCUSSION_ROUND_USER_PROMPT",
     "THEMES_JA",
 ]
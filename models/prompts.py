@@ -1,12 +1,11 @@
+# System prompts hold only the static rules so the provider can cache the
+# prefix; every per-call variable lives in the matching *_USER_PROMPT, ordered
+# from most to least shared (theme, history, round state, then per-agent data)
+# so calls within a round, and successive rounds, keep a common prefix.
+
 SPEAKER_SYSTEM_PROMPT = """あなたはカードゲームのプレイヤーです。
 お題に沿って、与えられた数字に対応する、次に出す単語を決めてください。与えられる数字の最大値は100で、最小値は1です。それを踏まえて、以下のルールに従ってください。
 
-現在の状況:
-お題: "{theme}"
-あなたの手札（秘密の数字）: {number}/100
-これまでの会話/履歴（参考）:
-{history}
-
 ルール:
 1. 数字を直接言ってはいけません。
 2. 数字を示唆する表現（例:「90くらい」「半分くらい」「高レベル」など）も禁止です。
@@ -20,38 +19,47 @@ SPEAKER_SYSTEM_PROMPT = """あなたはカードゲームのプレイヤーで
 }}
 """
 
-ESTIMATOR_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」のプレイヤーです。
-目的は、全員が手札（1〜100）を小さい順に安全に出し切ることです。
-
-現在の状況:
+SPEAKER_USER_PROMPT = """現在の状況:
 お題: "{theme}"
-場に出ている最大値: {last_played_card}（0ならまだ出ていない）
-
 これまでの会話/履歴（参考）:
 {history}
 
-他プレイヤーの発言（※自分以外）:
-{utterances}
+あなたの手札（秘密の数字）: {number}/100
+"""
 
-あなたの情報:
-- あなたの秘密の数字: {my_number}/100
-- あなたの発言: {my_word}
+ESTIMATOR_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」のプレイヤーです。
+目的は、全員が手札（1〜100）を小さい順に安全に出し切ることです。
 
 判断ルール:
-1. まず、もし {my_number} < {last_played_card} なら、この時点で出すと失敗する可能性が高い（=基本WAIT）。
+1. まず、もしあなたの秘密の数字が場に出ている最大値より小さいなら、この時点で出すと失敗する可能性が高い（=基本WAIT）。
 2. 他者の発言から「数字の大小」を推測し、自分が"次に出すべき最小候補"かどうかを考える。
 3. 自分が次に出しても良さそう（=未プレイの中で自分が最小の可能性が高い）なら PLAY。
 4. 少しでも自分より小さい人がいそうなら WAIT。
 
-出力は必ず次のJSONだけにしてください（前後の文章禁止、コードフェンス禁止）。
+出力は必ず次のJSONだけにしてください（前後の文章禁止、コードフェンス禁止）。"action" を必ず先に出力してください。
 
 出力フォーマット(JSON):
 {{
-    "thought": "推論（日本語で1〜4文）",
-    "action": "PLAY" または "WAIT"
+    "action": "PLAY" または "WAIT",
+    "thought": "推論（日本語で1〜4文）"
 }}
 """
 
+ESTIMATOR_USER_PROMPT = """現在の状況:
+お題: "{theme}"
+これまでの会話/履歴（参考）:
+{history}
+
+場に出ている最大値: {last_played_card}（0ならまだ出ていない）
+
+他プレイヤーの発言（※自分以外）:
+{utterances}
+
+あなたの情報:
+- あなたの秘密の数字: {my_number}/100
+- あなたの発言: {my_word}
+"""
+
 DISCUSSION_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」の進行役です。
 全員がWAITしていてゲームが進まないため、誤解を減らすための「質問」を1つだけ作ってください。
 
@@ -60,15 +68,6 @@ DISCUSSION_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」の進行
 - お題に沿った比較がしやすくなる質問にする。
 - 質問は短く具体的に。
 
-お題: "{theme}"
-場に出ている最大値: {last_played_card}
-
-現在の発言:
-{utterances}
-
-これまでの履歴（参考）:
-{history}
-
 出力は必ず次のJSONだけにしてください（前後の文章禁止、コードフェンス禁止）。
 
 出力フォーマット(JSON):
@@ -77,6 +76,16 @@ DISCUSSION_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」の進行
 }}
 """
 
+DISCUSSION_USER_PROMPT = """お題: "{theme}"
+これまでの履歴（参考）:
+{history}
+
+場に出ている最大値: {last_played_card}
+
+現在の発言:
+{utterances}
+"""
+
 DISCUSSION_PLAYER_QUESTION_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」のプレイヤーです。
 全員がWAITしていてゲームが進まないため、誤解を減らすための「質問」を1つだけ提案してください。
 
@@ -85,17 +94,6 @@ DISCUSSION_PLAYER_QUESTION_SYSTEM_PROMPT = """あなたはカードゲーム「I
 - お題に沿った比較がしやすくなる質問にする。
 - 質問は短く具体的に。
 
-お題: "{theme}"
-場に出ている最大値: {last_played_card}
-
-現在の発言（全員）:
-{utterances}
-
-あなたの発言: {my_word}
-
-これまでの履歴（参考）:
-{history}
-
 出力は必ず次のJSONだけにしてください（前後の文章禁止、コードフェンス禁止）。
 
 出力フォーマット(JSON):
@@ -104,6 +102,18 @@ DISCUSSION_PLAYER_QUESTION_SYSTEM_PROMPT = """あなたはカードゲーム「I
 }}
 """
 
+DISCUSSION_PLAYER_QUESTION_USER_PROMPT = """お題: "{theme}"
+これまでの履歴（参考）:
+{history}
+
+場に出ている最大値: {last_played_card}
+
+現在の発言（全員）:
+{utterances}
+
+あなたの発言: {my_word}
+"""
+
 DISCUSSION_ANSWER_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」のプレイヤーです。
 進行役からの質問に対して、あなたの発言（単語/短いフレーズ）のニュアンスが伝わるように短く回答してください。
 
@@ -112,18 +122,92 @@ DISCUSSION_ANSWER_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」の
 - 自分の手札の大小を推測させる表現（例:「かなり高い」「低め」など）は避け、あくまで"イメージ"で答える。
 - 回答は短く具体的に（1〜2文）。
 
-お題: "{theme}"
+出力は必ず次のJSONだけにしてください（前後の文章禁止、コードフェンス禁止）。
+
+出力フォーマット(JSON):
+{{
+    "answer": "回答（日本語、1〜2文）"
+}}
+"""
+
+DISCUSSION_ANSWER_USER_PROMPT = """お題: "{theme}"
+これまでの履歴（参考）:
+{history}
+
 進行役の質問: {question}
 
 あなたの発言: {my_word}
+"""
 
-これまでの履歴（参考）:
+SPEAKER_BATCH_SYSTEM_PROMPT = """あなたはカードゲームの複数プレイヤーの発言をまとめて担当します。
+お題に沿って、各プレイヤーに与えられた数字に対応する、次に出す単語をそれぞれ決めてください。与えられる数字の最大値は100で、最小値は1です。それを踏まえて、以下のルールに従ってください。
+
+ルール:
+1. 数字を直接言ってはいけません。
+2. 数字を示唆する表現（例:「90くらい」「半分くらい」「高レベル」など）も禁止です。
+3. お題に沿って、数字の大きさに比例した単語を選んでください。
+4. 各プレイヤーの単語は、そのプレイヤー自身の数字だけを基準に独立して決めてください。
+5. 出力は必ず次のJSONだけにしてください（前後の文章禁止、コードフェンス禁止）。"results" に全プレイヤー分を入れ、"index" はプレイヤー番号と一致させてください。
+
+出力フォーマット(JSON):
+{{
+    "results": [
+        {{
+            "index": 1,
+            "reasoning": "その単語を選んだ理由（日本語で1〜3文）",
+            "word": "単語または短いフレーズ"
+        }}
+    ]
+}}
+"""
+
+SPEAKER_BATCH_USER_PROMPT = """現在の状況:
+お題: "{theme}"
+これまでの会話/履歴（参考）:
 {history}
 
-出力は必ず次のJSONだけにしてください（前後の文章禁止、コードフェンス禁止）。
+各プレイヤーの手札（秘密の数字）:
+{items}
+"""
+
+DISCUSSION_ROUND_SYSTEM_PROMPT = """あなたはカードゲーム「Ito」の複数プレイヤーの会話フェーズをまとめて担当します。
+全員がWAITしていてゲームが進まないため、各プレイヤーが誤解を減らすための「質問」を1つずつ提案し、さらに各プレイヤーが全員の質問に回答します。
+
+制約:
+- 数字や割合など、数値を直接・間接に示唆しない。
+- 質問はお題に沿った比較がしやすいものにし、短く具体的に（1文）。
+- 回答は、そのプレイヤー自身の発言（単語/短いフレーズ）のニュアンスが伝わるように、あくまで"イメージ"で短く答える（1〜2文）。
+- 手札の大小を推測させる表現（例:「かなり高い」「低め」など）は避ける。
+
+出力は必ず次のJSONだけにしてください（前後の文章禁止、コードフェンス禁止）。"questions" に全プレイヤー分の質問を、"answers" に全プレイヤーから全質問への回答を入れてください。"index" は回答・質問するプレイヤー番号、"question_index" は質問したプレイヤー番号と一致させてください。
 
 出力フォーマット(JSON):
 {{
-    "answer": "回答（日本語、1〜2文）"
+    "questions": [
+        {{
+            "index": 1,
+            "question": "質問（日本語、1文）"
+        }}
+    ],
+    "answers": [
+        {{
+            "index": 1,
+            "question_index": 1,
+            "answer": "回答（日本語、1〜2文）"
+        }}
+    ]
 }}
 """
+
+DISCUSSION_ROUND_USER_PROMPT = """お題: "{theme}"
+これまでの履歴（参考）:
+{history}
+
+場に出ている最大値: {last_played_card}
+
+現在の発言（全員）:
+{utterances}
+
+担当するプレイヤー:
+{items}
+"""
@@ -1,10 +1,21 @@
-from typing import List, Dict, Optional, TypedDict, Literal
+import operator
+from typing import Annotated, List, Dict, Optional, TypedDict, Literal, get_type_hints
+
+from pydantic import BaseModel, Field
 
 class GameState(TypedDict, total=False):
-    """Global state of the game."""
+    """Global state of the game.
+
+    Nodes return only the keys they change; the list fields below are
+    appended to by their reducers rather than replaced.
+
+    The reducers must not extend the existing list in place: LangGraph's
+    channel copies share the list object, so an in-place reducer applies
+    the same update more than once.
+    """
     theme: str                  # Current theme (e.g., "Strong animals")
-    history: List[str]          # Game log
-    played_cards: List[int]     # List of cards played on the table (for validation)
+    history: Annotated[List[str], operator.add]  # Game log
+    played_cards: Annotated[List[int], operator.add]  # List of cards played on the table (for validation)
     last_played_card: int       # The number of the last played card (if smaller than this, failure)
     utterances: Dict[str, str]  # {AgentID: "Spoken word"}
     turn_count: int             # Current turn number
@@ -13,15 +24,42 @@ class GameState(TypedDict, total=False):
     agents: List[str]           # List of agent IDs
     hands: Dict[str, int]       # {AgentID: CardNumber}
     votes: Dict[str, Literal["PLAY", "WAIT"]]  # {AgentID: "PLAY"|"WAIT"}
-    finished_agents: List[str]  # Agents who already played
+    finished_agents: Annotated[List[str], operator.add]  # Agents who already played
     speaker_reasonings: Dict[str, str]  # {AgentID: reasoning}
     estimator_thoughts: Dict[str, str]  # {AgentID: thought}
     debug: bool
     reveal: bool
     theme_override: str
 
+# GameState fields whose node updates are appended (the operator.add reducers)
+APPENDED_FIELDS = frozenset(
+    name
+    for name, hint in get_type_hints(GameState, include_extras=True).items()
+    if getattr(hint, "__metadata__", None) == (operator.add,)
+)
+
 class AgentState(TypedDict):
     """State of a single agent."""
     agent_id: str
     hand_card: int              # Secret number (1-100)
     word: Optional[str]         # The word the agent decided to say
+
+
+# Structured LLM outputs (ITO_STRUCTURED_OUTPUT); fields mirror the JSON in models/prompts.py
+class SpeakerOutput(BaseModel):
+    """A speaker's word for its number."""
+    reasoning: str = Field(description="その単語を選んだ理由（日本語で1〜3文）")
+    word: str = Field(description="単語または短いフレーズ")
+
+class EstimatorOutput(BaseModel):
+    """An estimator's PLAY/WAIT decision."""
+    action: Literal["PLAY", "WAIT"]
+    thought: str = Field(description="推論（日本語で1〜4文）")
+
+class QuestionOutput(BaseModel):
+    """A discussion question."""
+    question: str = Field(description="質問（日本語、1文）")
+
+class AnswerOutput(BaseModel):
+    """A player's answer to a discussion question."""
+    answer: str = Field(description="回答（日本語、1〜2文）")
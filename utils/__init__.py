@@ -1,21 +1,46 @@
 # Empty __init__ for utils package
-from .deck import create_deck, draw_card
-from .parsing import parse_json_object
+from .deck import create_deck, draw_card, deal_hands, remaining_cards
+from .parsing import parse_json_object, parse_json_array, as_json_object, agent_at_index, truncate_history, join_history, format_utterances, normalize_question
 from .llm import (
     create_chat_llm,
     get_provider,
     get_model,
     clear_llm_cache,
+    env_flag,
+    is_mock_mode,
+    get_chain,
+    ainvoke_with_retry,
     get_provider as Provider,
 )
+from .prompting import FormatPrompt
+from .llm_cache import ResponseCache, SQLiteLLMCache, get_response_cache, clear_response_cache, get_llm_cache
 
 __all__ = [
     "create_deck",
     "draw_card",
+    "deal_hands",
+    "remaining_cards",
     "parse_json_object",
+    "parse_json_array",
+    "as_json_object",
+    "agent_at_index",
+    "truncate_history",
+    "join_history",
+    "normalize_question",
+    "format_utterances",
     "create_chat_llm",
     "get_provider",
     "get_model",
     "clear_llm_cache",
+    "env_flag",
+    "is_mock_mode",
+    "get_chain",
+    "ainvoke_with_retry",
     "Provider",
+    "FormatPrompt",
+    "ResponseCache",
+    "get_response_cache",
+    "clear_response_cache",
+    "SQLiteLLMCache",
+    "get_llm_cache",
 ]
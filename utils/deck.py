@@ -1,10 +1,12 @@
 import random
-from typing import List
+from typing import Dict, List, Sequence, Tuple
+
+_CARDS = range(1, 101)
 
 
 def create_deck() -> List[int]:
     """Creates a shuffled deck of cards numbered 1 to 100."""
-    deck = list(range(1, 101))
+    deck = list(_CARDS)
     random.shuffle(deck)
     return deck
 
@@ -14,3 +16,19 @@ def draw_card(deck: List[int]) -> int:
     if not deck:
         raise IndexError("Deck is empty")
     return deck.pop()
+
+
+def remaining_cards(used: set) -> List[int]:
+    """Cards 1 to 100 not in ``used``, in ascending order."""
+    return [card for card in _CARDS if card not in used]
+
+
+def deal_hands(agents: Sequence[str]) -> Tuple[Dict[str, int], List[int]]:
+    """Deal one unique card per agent; returns (hands, remaining deck).
+
+    Samples only len(agents) cards instead of shuffling the whole deck. Ito
+    never draws after the deal, so the remaining deck is returned empty; use
+    create_deck() or remaining_cards() when the rest of the cards is needed.
+    """
+    cards = random.sample(_CARDS, len(agents))
+    return dict(zip(agents, cards)), []
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable
+
+import httpx
+
+
+class ResettableTransport(httpx.BaseTransport):
+    """Sync transport whose connection pool can be dropped and rebuilt.
+
+    httpx.Client.close() makes the client unusable, but LLM instances keep
+    pointing at the shared client; reset() closes the pooled connections and
+    the next request opens a fresh pool instead.
+    """
+
+    def __init__(self, **kwargs: Any):
+        self._kwargs = kwargs
+        self._pool: httpx.HTTPTransport | None = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> httpx.HTTPTransport:
+        with self._lock:
+            if self._pool is None:
+                self._pool = httpx.HTTPTransport(**self._kwargs)
+            return self._pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._get_pool().handle_request(request)
+
+    def reset(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def close(self) -> None:
+        self.reset()
+
+
+class PerLoopAsyncTransport(httpx.AsyncBaseTransport):
+    """Async transport with one connection pool per event loop.
+
+    Keep-alive connections belong to the loop that opened them, so a pool
+    shared across asyncio.run() calls fails with "Event loop is closed" on
+    reuse. Each loop gets its own pool; pools of closed loops are dropped.
+    """
+
+    def __init__(self, **kwargs: Any):
+        self._kwargs = kwargs
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        # Pending aclose() tasks, referenced until done so they are not collected
+        self._closing: set[asyncio.Task] = set()
+
+    def _get_pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                # A closed loop's connections can be neither reused nor closed
+                for old in [other for other in self._pools if other.is_closed()]:
+                    del self._pools[old]
+                pool = httpx.AsyncHTTPTransport(**self._kwargs)
+                self._pools[loop] = pool
+            return pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._get_pool().handle_async_request(request)
+
+    def reset(self) -> None:
+        """Drop every pool; the running loop's pool is closed in a task."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        with self._lock:
+            pools = dict(self._pools)
+            self._pools.clear()
+        pool = pools.get(running) if running is not None else None
+        if pool is not None:
+            task = running.create_task(pool.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.pop(loop, None)
+        if pool is not None:
+            await pool.aclose()
+
+
+def environment_mounts(make_transport: Callable[..., Any]) -> dict[str, Any]:
+    """Proxy mounts for HTTP(S)_PROXY / ALL_PROXY / NO_PROXY, built with make_transport.
+
+    httpx only reads the proxy environment when no transport is passed, so
+    clients built on the transports above mount these explicitly. NO_PROXY
+    patterns map to None (no proxy), as in httpx.
+    """
+    from httpx._utils import get_environment_proxies
+
+    return {
+        pattern: None if url is None else make_transport(proxy=httpx.Proxy(url=url))
+        for pattern, url in get_environment_proxies().items()
+    }
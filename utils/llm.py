@@ -1,16 +1,42 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import random
+import weakref
 from typing import Any, Literal
 
 from dotenv import load_dotenv
 
+from .llm_cache import clear_llm_response_cache, clear_response_cache, get_llm_cache
+
 load_dotenv()
 
 Provider = Literal["openai", "gemini"]
 
 _global_llm_instances: dict[str, Any] = {}
 
+# Connection pool settings shared by every LLM instance (all roles)
+_HTTP_LIMITS = {"max_connections": 64, "max_keepalive_connections": 32}
+_HTTP_TIMEOUT = {"connect": 5.0, "read": 60.0, "write": 10.0, "pool": 5.0}
+
+_shared_http_client: Any = None
+_shared_async_http_client: Any = None
+# Transports behind the shared clients; clear_llm_cache() resets their pools
+_http_transports: list[Any] = []
+
+# Roles served by ITO_SMALL_MODEL (when set) instead of ITO_MODEL
+_SMALL_MODEL_ROLES = frozenset({"estimator"})
+
+# {(id(prompt), id(llm), schema): (llm, chain)}, oldest evicted first
+_chain_cache: dict[tuple[int, int, Any], tuple[Any, Any]] = {}
+_CHAIN_CACHE_SIZE = 64
+
+# One semaphore per event loop; asyncio primitives cannot be shared across loops
+_llm_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
 
 def _is_truthy(value: str | None) -> bool:
     if value is None:
@@ -18,6 +44,89 @@ def _is_truthy(value: str | None) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def env_flag(name: str) -> bool:
+    """True when the environment variable is set to a truthy value (1/true/yes/on)."""
+    return _is_truthy(os.getenv(name))
+
+
+def is_mock_mode() -> bool:
+    """True when ITO_FORCE_MOCK forces every agent onto its mock path."""
+    return env_flag("ITO_FORCE_MOCK")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pool_kwargs() -> dict[str, Any]:
+    import httpx
+
+    return {"http2": _http2_available(), "limits": httpx.Limits(**_HTTP_LIMITS)}
+
+
+def _build_http_client(client_cls: Any, transport_cls: Any) -> Any:
+    import httpx
+
+    from .http_pool import environment_mounts
+
+    kwargs = _pool_kwargs()
+    transport = transport_cls(**kwargs)
+    mounts = environment_mounts(lambda proxy: transport_cls(proxy=proxy, **kwargs))
+    _http_transports.append(transport)
+    _http_transports.extend(mount for mount in mounts.values() if mount is not None)
+    # Same defaults as openai's DefaultHttpxClient, plus the shared pooling
+    return client_cls(
+        transport=transport,
+        mounts=mounts,
+        timeout=httpx.Timeout(**_HTTP_TIMEOUT),
+        follow_redirects=True,
+    )
+
+
+def get_http_client() -> Any:
+    """Get the process-wide httpx client shared by the OpenAI LLM instances.
+
+    Keep-alive connections are pooled across roles; HTTP/2 is enabled when the
+    optional 'h2' package is installed. Proxies from the environment apply.
+    """
+    global _shared_http_client
+    if _shared_http_client is None:
+        import httpx
+
+        from .http_pool import ResettableTransport
+
+        _shared_http_client = _build_http_client(httpx.Client, ResettableTransport)
+    return _shared_http_client
+
+
+def get_async_http_client() -> Any:
+    """Async counterpart of get_http_client, used by ainvoke/astream calls.
+
+    The client is shared, but its transports keep one connection pool per
+    event loop, so games run with separate asyncio.run() calls don't reuse
+    connections bound to a closed loop.
+    """
+    global _shared_async_http_client
+    if _shared_async_http_client is None:
+        import httpx
+
+        from .http_pool import PerLoopAsyncTransport
+
+        _shared_async_http_client = _build_http_client(httpx.AsyncClient, PerLoopAsyncTransport)
+    return _shared_async_http_client
+
+
+def _reset_http_pools() -> None:
+    # Only the pooled connections are closed: LLM instances held elsewhere
+    # (set_*_llm, the agents' context variables) still use these clients
+    for transport in _http_transports:
+        transport.reset()
+
+
 def get_provider() -> Provider:
     """Get the configured LLM provider."""
     provider = (os.getenv("ITO_PROVIDER") or "openai").strip().lower()
@@ -33,6 +142,10 @@ def get_model(role: Literal["speaker", "estimator", "discussion"]) -> str:
     if os.getenv(role_key):
         return os.getenv(role_key) or ""
 
+    # The estimator only picks PLAY/WAIT, so it may be routed to a smaller model
+    if role in _SMALL_MODEL_ROLES and os.getenv("ITO_SMALL_MODEL"):
+        return os.getenv("ITO_SMALL_MODEL") or ""
+
     # Generic override
     if os.getenv("ITO_MODEL"):
         return os.getenv("ITO_MODEL") or ""
@@ -43,6 +156,14 @@ def get_model(role: Literal["speaker", "estimator", "discussion"]) -> str:
     return "gpt-4o-mini"
 
 
+def _openai_flag(name: str, base_url: str | None) -> bool:
+    """OpenAI-only request options: on by default, opt-in for a custom OPENAI_API_BASE.
+
+    OpenAI-compatible servers may reject parameters they don't know.
+    """
+    return _is_truthy(os.getenv(name, "0" if base_url else "1"))
+
+
 def create_chat_llm(
     *,
     role: Literal["speaker", "estimator", "discussion"],
@@ -51,19 +172,22 @@ def create_chat_llm(
 ) -> Any | None:
     """Return a LangChain chat model instance or None (mock mode)."""
 
-    if _is_truthy(os.getenv("ITO_FORCE_MOCK")):
+    if is_mock_mode():
         return None
 
     if mock_llm is not None:
         return mock_llm
 
-    # Check for singleton instance
-    cache_key = f"{get_provider()}:{get_model(role)}"
+    # Check for singleton instance; roles differ in temperature and cache key,
+    # and instances are cheap since they share the HTTP clients
+    cache_key = f"{get_provider()}:{get_model(role)}:{role}:{temperature}"
     if cache_key in _global_llm_instances:
         return _global_llm_instances[cache_key]
 
     provider = get_provider()
     model = get_model(role)
+    # Exact-match reply cache (ITO_CACHE=mem|sqlite), e.g. across training episodes
+    llm_cache = get_llm_cache()
 
     # --- API MODE ---
     if provider == "openai":
@@ -74,11 +198,22 @@ def create_chat_llm(
             return None
 
         base_url = os.getenv("OPENAI_API_BASE")
+        model_kwargs: dict[str, Any] = {}
+        if _openai_flag("ITO_JSON_MODE", base_url):
+            model_kwargs["response_format"] = {"type": "json_object"}
+        if _openai_flag("ITO_PROMPT_CACHE", base_url):
+            # Requests sharing a key are routed together, so a role's common
+            # prompt prefix stays in the provider's cache across calls
+            model_kwargs["prompt_cache_key"] = f"ito-{role}"
         llm = ChatOpenAI(
             model=model,
             temperature=temperature,
             api_key=api_key,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+            **({"cache": llm_cache} if llm_cache is not None else {}),
             **({"base_url": base_url} if base_url else {}),
+            **({"model_kwargs": model_kwargs} if model_kwargs else {}),
         )
         _global_llm_instances[cache_key] = llm
         return llm
@@ -89,21 +224,119 @@ def create_chat_llm(
         return None
 
     try:
+        import httpx
         from langchain_google_genai import ChatGoogleGenerativeAI
     except Exception:  # pragma: no cover
         raise RuntimeError(
             "Gemini provider selected but 'langchain-google-genai' is not installed."
         )
 
+    # Every agent prompt asks for a JSON object; let the provider enforce it
+    json_mode = _is_truthy(os.getenv("ITO_JSON_MODE", "1"))
     llm = ChatGoogleGenerativeAI(
         model=model,
         temperature=temperature,
         google_api_key=api_key,
+        **({"response_mime_type": "application/json"} if json_mode else {}),
+        **({"cache": llm_cache} if llm_cache is not None else {}),
+        # google-genai builds its own httpx clients; share the pool settings
+        client_args={
+            "http2": _http2_available(),
+            "limits": httpx.Limits(**_HTTP_LIMITS),
+        },
     )
     _global_llm_instances[cache_key] = llm
     return llm
 
 
+def _model_dump(output: Any) -> Any:
+    return output.model_dump() if hasattr(output, "model_dump") else output
+
+
+def _build_chain(prompt: Any, llm: Any, schema: Any) -> Any:
+    if schema is not None and env_flag("ITO_STRUCTURED_OUTPUT"):
+        try:
+            structured = llm.with_structured_output(schema)
+        except NotImplementedError:
+            pass  # e.g. fake/test models without tool calling; parse text instead
+        else:
+            from langchain_core.runnables import RunnableLambda
+
+            return prompt | structured | RunnableLambda(_model_dump)
+
+    from langchain_core.output_parsers import StrOutputParser
+
+    return prompt | llm | StrOutputParser()
+
+
+def get_chain(prompt: Any, llm: Any, schema: Any = None) -> Any:
+    """Get ``prompt | llm | StrOutputParser()``, built once per (prompt, LLM) pair.
+
+    ``prompt`` (a FormatPrompt or ChatPromptTemplate) must be module-level so
+    its identity is stable. Keeping one chain per LLM means games that run
+    side by side with different models (see set_*_llm) don't rebuild chains
+    on every call.
+
+    With ITO_STRUCTURED_OUTPUT set and a Pydantic ``schema`` given, the chain
+    uses ``llm.with_structured_output(schema)`` and returns a dict instead of
+    text (see utils.parsing.as_json_object); models without structured output
+    support keep the text chain.
+    """
+    if not env_flag("ITO_STRUCTURED_OUTPUT"):
+        schema = None
+    key = (id(prompt), id(llm), schema)
+    cached = _chain_cache.get(key)
+    # The stored llm reference keeps id(llm) from being reused while cached
+    if cached is None or cached[0] is not llm:
+        cached = (llm, _build_chain(prompt, llm, schema))
+        _chain_cache[key] = cached
+        if len(_chain_cache) > _CHAIN_CACHE_SIZE:
+            del _chain_cache[next(iter(_chain_cache))]
+    return cached[1]
+
+
 def clear_llm_cache() -> None:
-    """Clear the LLM instance cache."""
+    """Clear the LLM instances, the estimator and ITO_CACHE replies and the shared HTTP connection pools."""
     _global_llm_instances.clear()
+    _chain_cache.clear()
+    clear_response_cache()
+    clear_llm_response_cache()
+    _reset_http_pools()
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore bounding concurrent LLM calls on the running loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(int(os.getenv("ITO_LLM_CONCURRENCY") or 8))
+        _llm_semaphores[loop] = semaphore
+    return semaphore
+
+
+def _is_rate_limit_error(exc: BaseException) -> bool:
+    if getattr(exc, "status_code", None) == 429 or getattr(exc, "code", None) == 429:
+        return True
+    return type(exc).__name__ in {"RateLimitError", "ResourceExhausted"}
+
+
+async def ainvoke_with_retry(
+    runnable: Any,
+    inputs: Any,
+    *,
+    max_attempts: int = 4,
+    base_delay: float = 1.0,
+) -> Any:
+    """Await ``runnable.ainvoke`` under the shared concurrency limit.
+
+    Rate-limit (429) errors are retried with jittered exponential backoff;
+    the semaphore is released while sleeping. ITO_LLM_CONCURRENCY sets the limit.
+    """
+    for attempt in range(max_attempts):
+        async with _get_llm_semaphore():
+            try:
+                return await runnable.ainvoke(inputs)
+            except Exception as e:
+                if attempt + 1 >= max_attempts or not _is_rate_limit_error(e):
+                    raise
+        await asyncio.sleep(base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
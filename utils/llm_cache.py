@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Sequence
+
+from langchain_core.caches import BaseCache, InMemoryCache
+
+from .parsing import _dumps, _loads
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss counters.
+
+    Only meant for deterministic (temperature=0) calls, where identical
+    prompts must produce identical outputs.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value, or None on a miss/expired entry."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+_response_cache = ResponseCache(
+    maxsize=int(os.getenv("ITO_RESPONSE_CACHE_SIZE") or 4096),
+    ttl=float(os.getenv("ITO_RESPONSE_CACHE_TTL") or 3600),
+)
+
+
+def is_deterministic(llm: Any) -> bool:
+    """True when the model was configured with temperature=0."""
+    return getattr(llm, "temperature", None) == 0
+
+
+def response_cache_key(role: str, llm: Any, rendered_prompt: str) -> tuple[str, str, str, str, str]:
+    """Build a cache key from the role, the model identity, its endpoint and the rendered prompt."""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or ""
+    # The same model name can be served by different endpoints (e.g. local servers)
+    base_url = getattr(llm, "openai_api_base", None) or getattr(llm, "base_url", None) or ""
+    return (role, type(llm).__name__, str(model), str(base_url), rendered_prompt)
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache."""
+    return _response_cache
+
+
+def clear_response_cache() -> None:
+    """Clear the response cache and reset its counters."""
+    _response_cache.clear()
+
+
+def _generation_to_dict(generation: Any) -> dict[str, Any]:
+    from langchain_core.messages import message_to_dict
+
+    entry: dict[str, Any] = {"generation_info": generation.generation_info}
+    message = getattr(generation, "message", None)
+    if message is not None:
+        entry["message"] = message_to_dict(message)
+    else:
+        entry["text"] = generation.text
+    return entry
+
+
+def _generation_from_dict(entry: dict[str, Any]) -> Any:
+    from langchain_core.messages import messages_from_dict
+    from langchain_core.outputs import ChatGeneration, Generation
+
+    if "message" in entry:
+        message = messages_from_dict([entry["message"]])[0]
+        return ChatGeneration(message=message, generation_info=entry.get("generation_info"))
+    return Generation(text=entry["text"], generation_info=entry.get("generation_info"))
+
+
+class SQLiteLLMCache(BaseCache):
+    """LangChain LLM cache persisted in a local SQLite file.
+
+    Entries are keyed by a BLAKE2b digest of (prompt, llm_string), which
+    LangChain builds from the model name and parameters, so a restarted
+    process (e.g. the next batch of training episodes) reuses earlier replies.
+    Whole messages are stored (additional_kwargs, tool calls, metadata), so
+    structured-output calls can be served from the cache as well.
+    """
+
+    def __init__(self, path: str = ".langchain.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_generations (key TEXT PRIMARY KEY, generations BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.blake2b(f"{llm_string}\0{prompt}".encode(), digest_size=20).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Sequence[Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations FROM llm_generations WHERE key = ?", (self._key(prompt, llm_string),)
+            ).fetchone()
+        if row is None:
+            return None
+        return [_generation_from_dict(entry) for entry in _loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        # UTF-8 JSON bytes (orjson when installed), stored as a BLOB
+        generations = _dumps([_generation_to_dict(generation) for generation in return_val])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_generations (key, generations) VALUES (?, ?)",
+                (self._key(prompt, llm_string), generations),
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_generations")
+            self._conn.commit()
+
+
+_llm_cache: BaseCache | None = None
+_llm_cache_config: tuple[str, str] | None = None
+
+
+def get_llm_cache() -> BaseCache | None:
+    """Get the LangChain cache selected by ITO_CACHE, or None when disabled.
+
+    ITO_CACHE=mem keeps replies in memory (ITO_RESPONSE_CACHE_SIZE entries);
+    ITO_CACHE=sqlite persists them to ITO_CACHE_PATH (default .langchain.db).
+    The cache is attached to the models built by create_chat_llm only, not
+    installed globally.
+    """
+    global _llm_cache, _llm_cache_config
+    mode = (os.getenv("ITO_CACHE") or "").strip().lower()
+    path = os.getenv("ITO_CACHE_PATH") or ".langchain.db"
+    if (mode, path) != _llm_cache_config:
+        if mode == "mem":
+            _llm_cache = InMemoryCache(maxsize=int(os.getenv("ITO_RESPONSE_CACHE_SIZE") or 4096))
+        elif mode == "sqlite":
+            _llm_cache = SQLiteLLMCache(path)
+        elif mode in {"", "0", "off", "none"}:
+            _llm_cache = None
+        else:
+            raise ValueError(f"Unsupported ITO_CACHE: {mode} (expected 'mem' or 'sqlite')")
+        _llm_cache_config = (mode, path)
+    return _llm_cache
+
+
+def clear_llm_response_cache() -> None:
+    """Clear the ITO_CACHE backend (for sqlite, this empties the file)."""
+    if _llm_cache is not None:
+        _llm_cache.clear()
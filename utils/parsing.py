@@ -1,39 +1,222 @@
 import json
-import re
+import os
+import unicodedata
 from typing import Any
 
+try:  # orjson is optional; it is a drop-in, faster parser/serializer
+    import orjson
 
-_JSON_BLOCK_RE = re.compile(r"\{.*\}", re.DOTALL)
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:  # pragma: no cover
+    _loads = json.loads
+
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False).encode()
+
+# Older history is dropped past this many characters (0 disables truncation)
+_HISTORY_MAX_CHARS = 4000
+_HISTORY_ELIDED = "（…以前の履歴は省略）"
+
+# Punctuation ignored when comparing questions (after NFKC, so full-width forms fold in)
+_QUESTION_PUNCT = str.maketrans("", "", "。、・「」『』.,!?")
+
+
+def _strip_code_fence(text: str) -> str:
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        # Plain slicing: drop the opening fence line and a trailing fence
+        head, sep, body = cleaned.partition("\n")
+        lang = head[3:].replace("_", "").replace("-", "")
+        if sep and (not lang or lang.isascii() and lang.isalnum()):
+            cleaned = body
+        if cleaned.endswith("\n```"):
+            cleaned = cleaned[:-4]
+        cleaned = cleaned.strip()
+    return cleaned
+
+
+def _match_bracket(text: str, start: int, open_ch: str, close_ch: str) -> int | None:
+    """Return the index just past the bracket closing text[start], or None.
+
+    Single linear scan; brackets inside JSON strings (and escaped quotes) are ignored.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == open_ch:
+            depth += 1
+        elif ch == close_ch:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def _extract_block(text: str, open_ch: str, close_ch: str) -> Any:
+    """Parse the first balanced open_ch...close_ch block that is valid JSON."""
+    start = text.find(open_ch)
+    while start != -1:
+        end = _match_bracket(text, start, open_ch, close_ch)
+        if end is None:
+            # Unbalanced here; a later open_ch may still start a valid block
+            start = text.find(open_ch, start + 1)
+            continue
+        try:
+            return _loads(text[start:end])
+        except ValueError:
+            start = text.find(open_ch, start + 1)
+    raise ValueError("No JSON block found in model output")
 
 
 def parse_json_object(text: str) -> dict[str, Any]:
     """Best-effort JSON object parser.
 
     - Accepts raw JSON
-    - Also tolerates extra text/code fences by extracting the first {...} block.
+    - Also tolerates extra text/code fences by extracting the first balanced {...} block.
     """
 
-    cleaned = text.strip()
-
     # Strip common fenced code blocks
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```[a-zA-Z0-9_-]*\n", "", cleaned)
-        cleaned = re.sub(r"\n```$", "", cleaned).strip()
+    cleaned = _strip_code_fence(text)
 
     # Try direct parse first
     try:
-        value = json.loads(cleaned)
+        value = _loads(cleaned)
         if isinstance(value, dict):
             return value
-    except Exception:
+    except ValueError:
         pass
 
     # Extract first JSON object-looking block
-    match = _JSON_BLOCK_RE.search(cleaned)
-    if not match:
-        raise ValueError("No JSON object found in model output")
-
-    value = json.loads(match.group(0))
+    try:
+        value = _extract_block(cleaned, "{", "}")
+    except ValueError:
+        raise ValueError("No JSON object found in model output") from None
     if not isinstance(value, dict):
         raise ValueError("Parsed JSON is not an object")
     return value
+
+
+def as_json_object(output: Any) -> dict[str, Any]:
+    """Return a structured-output dict as-is, or parse text with parse_json_object."""
+    if isinstance(output, dict):
+        return output
+    return parse_json_object(output)
+
+
+def parse_json_array(text: str) -> list[Any]:
+    """Best-effort JSON array parser (same tolerance as parse_json_object).
+
+    - Accepts a raw JSON array
+    - Also accepts an object wrapping a single array value (e.g. {"results": [...]})
+    """
+
+    cleaned = _strip_code_fence(text)
+
+    try:
+        value = _loads(cleaned)
+        if isinstance(value, list):
+            return value
+        if isinstance(value, dict):
+            arrays = [v for v in value.values() if isinstance(v, list)]
+            if len(arrays) == 1:
+                return arrays[0]
+    except ValueError:
+        pass
+
+    # Extract first JSON array-looking block
+    try:
+        value = _extract_block(cleaned, "[", "]")
+    except ValueError:
+        raise ValueError("No JSON array found in model output") from None
+    if not isinstance(value, list):
+        raise ValueError("Parsed JSON is not an array")
+    return value
+
+
+def agent_at_index(agent_ids: list[str], index: Any) -> str | None:
+    """Map a model-supplied 1-based index to its agent, or None if it is invalid.
+
+    0 and negative indexes are rejected rather than wrapping to the last agents.
+    """
+    try:
+        position = int(index) - 1
+    except (TypeError, ValueError):
+        return None
+    return agent_ids[position] if 0 <= position < len(agent_ids) else None
+
+
+def _history_max_chars() -> int:
+    # Read on every call, like the other ITO_* flags, so it can be changed at runtime
+    return int(os.getenv("ITO_HISTORY_MAX_CHARS") or _HISTORY_MAX_CHARS)
+
+
+def truncate_history(history: str, max_chars: int | None = None) -> str:
+    """Keep only the most recent history lines that fit in max_chars.
+
+    The cut is made on a line boundary so no entry is half-kept, which keeps
+    the prompt size per call bounded no matter how long the game runs. The
+    result, elision marker included, fits in max_chars, so truncating twice
+    is a no-op.
+    """
+    limit = _history_max_chars() if max_chars is None else max_chars
+    if limit <= 0 or len(history) <= limit:
+        return history
+    budget = max(limit - len(_HISTORY_ELIDED) - 1, 1)
+    cut = history.find("\n", len(history) - budget - 1)
+    tail = history[cut + 1:] if cut != -1 else history[-budget:]
+    return f"{_HISTORY_ELIDED}\n{tail}"
+
+
+def join_history(lines: list[str], max_chars: int | None = None) -> str:
+    """Same as truncate_history("\\n".join(lines)), but only the kept tail is joined.
+
+    History grows every turn, so joining it all just to drop most of it again
+    made each node O(total history); this walks back over the last lines only.
+    """
+    limit = _history_max_chars() if max_chars is None else max_chars
+    if limit <= 0:
+        return "\n".join(lines)
+    budget = max(limit - len(_HISTORY_ELIDED) - 1, 1)
+    start = len(lines)
+    total = -1  # no separator before the first kept line
+    for i in range(len(lines) - 1, -1, -1):
+        total += len(lines[i]) + 1
+        if total > limit:
+            break
+        if total <= budget:
+            start = i
+    else:
+        return "\n".join(lines)
+    if start == len(lines):
+        tail = lines[-1][-budget:]
+    else:
+        tail = "\n".join(lines[start:])
+    return f"{_HISTORY_ELIDED}\n{tail}"
+
+
+def format_utterances(utterances: dict[str, str], exclude: str | None = None) -> str:
+    """Format utterances as "agent: word" lines, optionally leaving one agent out."""
+    # A list comprehension beats a generator here: str.join materializes it anyway
+    return "\n".join([f"{agent}: {word}" for agent, word in utterances.items() if agent != exclude])
+
+
+def normalize_question(question: str) -> str:
+    """Comparison key for questions: NFKC, lowercase, no punctuation or whitespace.
+
+    Japanese text has no word spacing, so whitespace is dropped rather than
+    collapsed; "どれくらい強いですか？" and "どれくらい 強いですか" compare equal.
+    """
+    folded = unicodedata.normalize("NFKC", question).lower().translate(_QUESTION_PUNCT)
+    return "".join(folded.split())
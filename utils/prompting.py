@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Any
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+
+class FormatPrompt(Runnable[dict, list[BaseMessage]]):
+    """System + human prompt rendered with ``str.format_map``.
+
+    A lighter stand-in for ``ChatPromptTemplate.from_messages`` for our fixed
+    prompt variables: the system text is unescaped once at construction and
+    each call is a single ``format_map``, with no template parsing or input
+    validation. Any ChatPromptTemplate still works with ``get_chain``.
+    """
+
+    def __init__(self, system: str, human: str):
+        # System prompts are static; turn their "{{ }}" escapes into braces once
+        self.system = system.format()
+        self.human = human
+        # ...and build their message once; every call shares it (never mutated)
+        self.system_message = SystemMessage(content=self.system)
+
+    def format_messages(self, **kwargs: Any) -> list[BaseMessage]:
+        return [self.system_message, HumanMessage(content=self.human.format_map(kwargs))]
+
+    def format(self, **kwargs: Any) -> str:
+        """Render the prompt as one string (same layout as ChatPromptTemplate.format)."""
+        return f"System: {self.system}\nHuman: {self.human.format_map(kwargs)}"
+
+    def invoke(self, input: dict, config: RunnableConfig | None = None, **kwargs: Any) -> list[BaseMessage]:
+        return self.format_messages(**input)
+
+    async def ainvoke(self, input: dict, config: RunnableConfig | None = None, **kwargs: Any) -> list[BaseMessage]:
+        # Pure string formatting; no need for the default executor hop
+        return self.invoke(input, config)
+
+    def batch(
+        self,
+        inputs: list[dict],
+        config: RunnableConfig | list[RunnableConfig] | None = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> list[Any]:
+        # Formatting is cheap; render inline instead of one thread per input
+        outputs: list[Any] = []
+        for item in inputs:
+            try:
+                outputs.append(self.invoke(item))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                outputs.append(e)
+        return outputs
+
+    async def abatch(
+        self,
+        inputs: list[dict],
+        config: RunnableConfig | list[RunnableConfig] | None = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> list[Any]:
+        return self.batch(inputs, config, return_exceptions=return_exceptions)